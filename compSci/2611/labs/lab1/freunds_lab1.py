@@ -20,11 +20,21 @@ For example, an investment of $1000 will have a value of $1080 after
 1 year, $1166.40 after two years, etc.
 """
 
-from math import sqrt
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from math import isqrt, sqrt
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the array inputs need it
+    np = None
 
-def nest_egg(investment, time):
-    return investment * pow(1.08, time)
+
+def nest_egg(investment, time, rate=0.08):
+    # pow broadcasts, so NumPy arrays work for any of the arguments
+    return investment * pow(1 + rate, time)
 
 """
 Problem 2: Nest Egg 2
@@ -39,15 +49,75 @@ reach $2000.
 """
 
 
-def nest_egg_2(investment, goal):
+def nest_egg_2(investment, goal, rate=0.08):
     years = 0
     balance = investment
     while balance < goal:
-        balance *= 1.08
+        balance *= 1 + rate
         years += 1
     return years
 
 
+def nest_egg_years(investment, goal, rate=0.08):
+    """
+    Vectorized nest_egg_2: years for each investment to reach its goal.
+
+    The arguments broadcast against each other like NumPy arrays. The year count
+    comes from the closed form ceil(log(goal / investment) / log(1 + rate)),
+    then any case where the balance lands within rounding error of the goal is
+    replayed with the year-by-year loop, so the answers are exactly what
+    nest_egg_2 returns. Returns an int for scalar inputs, else an int64 array.
+
+    Raises ValueError if some investment could never reach its goal (a balance
+    of zero or below, or a rate of zero or below).
+    """
+    if np is None:
+        raise ImportError("nest_egg_years requires NumPy")
+
+    investment, goal, growth = np.broadcast_arrays(
+        np.asarray(investment, dtype=float),
+        np.asarray(goal, dtype=float),
+        1 + np.asarray(rate, dtype=float),
+    )
+    active = investment < goal
+    if (active & ((investment <= 0) | ~(growth > 1))).any():
+        raise ValueError("an investment can't reach its goal without growing")
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        years = np.where(active, np.ceil(np.log(goal / investment) / np.log(growth)), 0)
+        # Step the estimate onto the first year at or above the goal
+        years += active & (investment * growth**years < goal)
+        years -= active & (years > 0) & (investment * growth ** (years - 1) >= goal)
+
+        # Repeated multiplication drifts from pow by about one rounding per year
+        tolerance = 4 * (years + 2) * np.finfo(float).eps
+        reached = investment * growth**years / goal - 1
+        before = investment * growth ** (years - 1) / goal - 1
+        unsure = active & ~(
+            np.isfinite(years)
+            & (np.abs(reached) > tolerance)
+            & (np.abs(before) > tolerance)
+        )
+
+    if unsure.any():
+        years[unsure] = _nest_egg_loop(investment[unsure], goal[unsure], growth[unsure])
+    years = years.astype(np.int64)
+    return int(years) if years.ndim == 0 else years
+
+
+def _nest_egg_loop(balance, goal, growth):
+    # nest_egg_2's loop across arrays; float64 products round exactly like Python floats
+    balance = balance.copy()
+    years = np.zeros(balance.shape)
+    active = balance < goal
+    with np.errstate(over="ignore"):  # an infinite goal is reached by overflowing
+        while active.any():
+            balance[active] *= growth[active]
+            years[active] += 1
+            active = balance < goal
+    return years
+
+
 """
 Problem 3: Draw Triangle
 Complete the draw_triangle(width) method below.
@@ -91,12 +161,271 @@ def is_prime(number):
 
     if number % 2 == 0: return False
 
+    if isinstance(number, int):
+        # Same answers as the loop below, from the sieve or Miller-Rabin
+        return _prime_flag(number)
+
     for i in range(3, int(sqrt(number) + 1), 2):
         if number % i == 0:
             return False
 
     return True
 
+
+# Largest number the cached sieve grows to (one bit per odd number, so 16 MiB)
+SIEVE_MAX = 1 << 28
+# Sieve up to the largest value when it is at most this many times the batch size
+SIEVE_DENSITY = 64
+SIEVE_SEGMENT = 1 << 18
+# Witnesses that make Miller-Rabin exact for every n below MILLER_RABIN_LIMIT
+# (the smallest strong pseudoprime to all of them, about 3.3e24), which covers 64 bits
+MILLER_RABIN_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+MILLER_RABIN_LIMIT = 3317044064679887385961981
+
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+class PrimeSieve:
+    """
+    Growable sieve of Eratosthenes over the odd numbers, one bit per number.
+
+    Bit i of the packed bytearray says whether 2i + 1 is prime. Growing only
+    sieves the new segments, a SIEVE_SEGMENT-sized window at a time, so earlier
+    work is never repeated.
+    """
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.limit = 0  # every number below limit is covered
+
+    def grow(self, n):
+        """Extend the sieve to cover n, at least doubling it (up to SIEVE_MAX)."""
+        if n < self.limit:
+            return
+        target = max(n + 1, min(2 * self.limit, SIEVE_MAX))
+        target = -(-target // 16) * 16  # whole bytes of odd numbers
+        root = isqrt(target)
+        if root < 1 << 12 and self.limit <= root:
+            # Tiny sieve: crossing off with every odd number is cheap enough
+            base = range(3, root + 1, 2)
+        else:
+            self.grow(root)
+            base = [2 * i + 1 for i in range(1, root // 2 + 1) if self._bit(i)]
+
+        chunks = [self.bits]
+        for low in range(self.limit, target, SIEVE_SEGMENT):
+            high = min(low + SIEVE_SEGMENT, target)
+            # Entry j stands for the odd number low + 2j + 1
+            segment = bytearray(b"\x01") * ((high - low) // 2)
+            if low == 0:
+                segment[0] = 0  # 1 is not prime
+            for p in base:
+                if p * p >= high:
+                    break
+                start = max(p * p, (low // p + 1) * p)
+                if start % 2 == 0:
+                    start += p
+                j = (start - low - 1) // 2
+                segment[j::p] = bytes(len(range(j, len(segment), p)))
+            # Pack eight entries per byte, lowest entry in the lowest bit
+            packed = int(segment.translate(_BIT_CHARS)[::-1], 2)
+            chunks.append(packed.to_bytes(len(segment) // 8, "little"))
+
+        self.bits = bytearray().join(chunks)
+        self.limit = target
+
+    def _bit(self, i):
+        return self.bits[i >> 3] >> (i & 7) & 1
+
+    def is_prime(self, n):
+        """Look n up; n must be below limit."""
+        if n < 3:
+            return n == 2
+        return n % 2 == 1 and self._bit(n >> 1) == 1
+
+    def mask(self, numbers):
+        """Vectorized lookup of a NumPy integer array whose values are all below limit."""
+        table = np.frombuffer(bytes(self.bits), dtype=np.uint8)
+        index = numbers >> 1
+        odd = numbers & 1 == 1
+        flags = (table[index >> 3] >> (index & 7).astype(np.uint8)) & 1 == 1
+        return (odd & flags & (numbers > 2)) | (numbers == 2)
+
+
+_sieve = PrimeSieve()
+
+
+def miller_rabin(n):
+    """
+    Deterministic Miller-Rabin test.
+
+    Exact for n < MILLER_RABIN_LIMIT (all 64-bit values); beyond that a True
+    answer only means n is a strong probable prime to the first thirteen prime bases.
+    """
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_WITNESSES:
+        if n % p == 0:
+            return n == p
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in MILLER_RABIN_WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _jacobi(a, n):
+    # Jacobi symbol (a/n) for odd n > 0
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def _strong_lucas(n):
+    # Strong Lucas probable-prime test with Selfridge's parameters, for odd n > 2
+    if isqrt(n) ** 2 == n:
+        return False
+    d = 5
+    while True:
+        j = _jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    p, q = 1, (1 - d) // 4
+
+    k = n + 1
+    s = 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+
+    def halve(x):
+        return (x + n if x % 2 else x) // 2 % n
+
+    # U_k, V_k and Q^k mod n by binary expansion of k, starting from k = 1
+    u, v, qk = 1, p, q % n
+    for bit in bin(k)[3:]:
+        u, v, qk = u * v % n, (v * v - 2 * qk) % n, qk * qk % n
+        if bit == "1":
+            u, v = halve(p * u + v), halve(d * u + p * v)
+            qk = qk * q % n
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v = (v * v - 2 * qk) % n
+        if v == 0:
+            return True
+        qk = qk * qk % n
+    return False
+
+
+def baillie_psw(n):
+    """
+    Baillie-PSW test: Miller-Rabin to base 2 plus a strong Lucas test.
+
+    No composite is known to pass it, but none has been proven impossible, so a
+    True answer for n >= MILLER_RABIN_LIMIT means probable prime.
+    """
+    if n < 2:
+        return False
+    for p in MILLER_RABIN_WITNESSES:
+        if n % p == 0:
+            return n == p
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    x = pow(2, d, n)
+    if x != 1 and x != n - 1:
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return _strong_lucas(n)
+
+
+def _prime_flag(n, exact=True):
+    if n < _sieve.limit:
+        return _sieve.is_prime(n)
+    if n < MILLER_RABIN_LIMIT:
+        return miller_rabin(n)
+    if not exact:
+        return baillie_psw(n)
+    # Past the proven bound only trial division is exact, however long it takes
+    if n % 2 == 0:
+        return False
+    for i in range(3, isqrt(n) + 1, 2):
+        if n % i == 0:
+            return False
+    return True
+
+
+def are_prime(numbers):
+    """
+    Test many integers for primality at once.
+
+    When the values are dense (the largest is at most SIEVE_DENSITY times the
+    batch size and below SIEVE_MAX), the cached sieve is grown to cover them
+    and each test is a bit lookup. Values beyond the sieve use Miller-Rabin,
+    which is exact below MILLER_RABIN_LIMIT (about 3.3e24). Larger values use the
+    Baillie-PSW test, so True there means probable prime; unlike is_prime, a
+    huge input never falls back to trial division. Unlike is_prime, 2 is
+    reported as prime.
+
+    numbers can be any iterable of ints, giving a list of bools, or a NumPy
+    integer array, giving a boolean array of the same shape.
+    """
+    if np is not None and isinstance(numbers, np.ndarray):
+        return _are_prime_array(numbers)
+
+    numbers = list(numbers)
+    if numbers:
+        largest = max(numbers)
+        if _sieve.limit <= largest < min(SIEVE_MAX, SIEVE_DENSITY * len(numbers)):
+            _sieve.grow(largest)
+    return [_prime_flag(n, exact=False) for n in numbers]
+
+
+def _are_prime_array(numbers):
+    if numbers.dtype.kind not in "iu":
+        raise TypeError(f"expected an integer array, got {numbers.dtype}")
+    flat = numbers.ravel()
+    result = np.zeros(flat.shape, dtype=bool)
+    if flat.size:
+        largest = int(flat.max())
+        if _sieve.limit <= largest < min(SIEVE_MAX, SIEVE_DENSITY * flat.size):
+            _sieve.grow(largest)
+        small = (flat >= 0) & (flat < _sieve.limit)
+        result[small] = _sieve.mask(flat[small].astype(np.int64))
+        large = np.flatnonzero(~small & (flat > 0))
+        result[large] = [miller_rabin(int(n)) for n in flat[large].tolist()]
+    return result.reshape(numbers.shape)
+
 """
 Problem 5: Palindrome Checker
 Complete the is_palindrome(word) method below.
@@ -140,6 +469,103 @@ def is_palindrome(word):
     return part1 == inverted2
 
 
+# Bytes normalized per translate call, and per work unit in parallel mode
+PALINDROME_CHUNK_SIZE = 1 << 22
+
+# One translate call lowercases ASCII letters and deletes every other ASCII
+# character except newlines (spaces and all punctuation); lines with non-ASCII
+# bytes are redone as decoded text
+_FOLD_CASE = bytes.maketrans(
+    bytes(range(ord("A"), ord("Z") + 1)), bytes(range(ord("a"), ord("z") + 1))
+)
+_NOT_ALNUM = bytes(b for b in range(128) if not chr(b).isalnum() and b != ord("\n"))
+
+
+def _palindrome_flags(chunk):
+    # Normalize a whole chunk of newline-terminated lines at once, then test each line
+    letters = chunk.translate(_FOLD_CASE, _NOT_ALNUM)
+    lines = letters.split(b"\n")
+    if chunk.endswith(b"\n"):
+        lines.pop()
+    if chunk.isascii():
+        return bytes(line == line[::-1] for line in lines)
+    # Reversing bytes would scramble multi-byte UTF-8 characters, so those lines
+    # are compared as case-folded characters instead
+    originals = chunk.split(b"\n")
+    return bytes(
+        line == line[::-1] if line.isascii() else _text_palindrome(original)
+        for line, original in zip(lines, originals)
+    )
+
+
+def _text_palindrome(line):
+    text = line.decode("utf-8", "replace").casefold()
+    letters = [c for c in text if c.isalnum()]
+    return letters == letters[::-1]
+
+
+def _palindrome_file_chunk(path, start, stop):
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return _palindrome_flags(buffer[start:stop])
+
+
+def _chunk_bounds(buffer, chunk_size):
+    # Split a buffer into byte ranges that end just after a newline
+    bounds = []
+    start = 0
+    while start < len(buffer):
+        stop = buffer.find(b"\n", start + chunk_size - 1) + 1 or len(buffer)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def _iter_stream_chunks(file, chunk_size):
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        # Finish the current line so no line straddles two chunks
+        yield chunk if chunk.endswith(b"\n") else chunk + file.readline()
+
+
+def iter_palindromes(source, workers=1, chunk_size=PALINDROME_CHUNK_SIZE):
+    """
+    Check every line of a corpus for being a palindrome, yielding one bool per line.
+
+    Lines are normalized like is_palindrome, except that all punctuation is
+    ignored, not just periods and commas. Lines are read as UTF-8, and ones with
+    non-ASCII characters are case-folded and compared character by character.
+    source can be a path (read through mmap), an open binary file, or a
+    bytes-like buffer such as an mmap. Input is handled chunk_size bytes at a
+    time with one translate call per chunk. With
+    workers other than 1, the chunks of a path are checked in a process pool;
+    results still come out in line order.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.getsize(source) == 0:
+            return
+        with open(source, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                bounds = _chunk_bounds(buffer, chunk_size)
+                if workers == 1:
+                    for start, stop in bounds:
+                        yield from map(bool, _palindrome_flags(buffer[start:stop]))
+                    return
+        with ProcessPoolExecutor(workers) as pool:
+            # Executor.map keeps submission order; each chunk comes back as 0/1 bytes
+            chunks = pool.map(_palindrome_file_chunk, repeat(source), *zip(*bounds))
+            for flags in chunks:
+                yield from map(bool, flags)
+    elif hasattr(source, "read"):
+        for chunk in _iter_stream_chunks(source, chunk_size):
+            yield from map(bool, _palindrome_flags(chunk))
+    else:
+        for start, stop in _chunk_bounds(source, chunk_size):
+            yield from map(bool, _palindrome_flags(source[start:stop]))
+
+
 """
 Problem 6: Credit Card Number Check.
 
@@ -169,3 +595,144 @@ def cc_check(card_number):
     total = sum(digits)
     return total % 10 == 0
 
+
+
+CARD_MIN_DIGITS = 13
+CARD_MAX_DIGITS = 19
+# Bytes read per chunk when validating card numbers from a file or stream
+CARD_CHUNK_SIZE = 1 << 22
+_CARD_SEPARATORS = b" -\t\r"
+
+if np is not None:
+    _PLACE_VALUES = 10 ** np.arange(CARD_MAX_DIGITS - 1, -1, -1, dtype=np.uint64)
+    _LUHN_DOUBLED = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+
+
+def _luhn_valid(digits):
+    # Luhn doubles every second digit counting from the right, so with the numbers
+    # right-aligned one weight pattern serves every length
+    digits = digits.copy()
+    digits[:, -2::-2] = _LUHN_DOUBLED[digits[:, -2::-2]]
+    return digits.sum(axis=1, dtype=np.int64) % 10 == 0
+
+
+def _check_card_ints(numbers):
+    if numbers.dtype.kind == "i":
+        negative = numbers < 0
+        numbers = np.where(negative, 0, numbers).astype(np.uint64)
+    else:
+        negative = np.zeros(numbers.shape, dtype=bool)
+        numbers = numbers.astype(np.uint64)
+    lengths = np.searchsorted(_PLACE_VALUES[::-1], numbers, side="right")
+    # uint64 reaches 20 digits, which the 19 place values can't see
+    lengths[numbers >= np.uint64(10**CARD_MAX_DIGITS)] = CARD_MAX_DIGITS + 1
+    well_formed = ~negative & (lengths >= CARD_MIN_DIGITS) & (lengths <= CARD_MAX_DIGITS)
+
+    # Peel digits off three 7-digit uint32 slices, adding each into the Luhn sum
+    # as it goes instead of building a digit matrix
+    seven = np.uint64(10**7)
+    slices = (numbers % seven, numbers // seven % seven, numbers // seven // seven)
+    total = np.zeros(len(numbers), dtype=np.uint32)
+    for offset, part in zip((0, 7, 14), slices):
+        part = part.astype(np.uint32)
+        for position in range(offset, min(offset + 7, CARD_MAX_DIGITS)):
+            part, digit = np.divmod(part, np.uint32(10))
+            total += _LUHN_DOUBLED[digit] if position % 2 else digit
+    return total % 10 == 0, lengths, well_formed, np.zeros(len(numbers), dtype=bool)
+
+
+def _check_card_lines(lines):
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    fits = (lengths >= CARD_MIN_DIGITS) & (lengths <= CARD_MAX_DIGITS)
+    # Leading zeros don't change a Luhn sum, so short numbers are zero-padded on the left
+    padded = b"".join(
+        line.rjust(CARD_MAX_DIGITS, b"0") if ok else b"0" * CARD_MAX_DIGITS
+        for line, ok in zip(lines, fits.tolist())
+    )
+    digits = np.frombuffer(padded, dtype=np.uint8).reshape(-1, CARD_MAX_DIGITS) - 48
+    well_formed = fits & (digits <= 9).all(axis=1)
+    digits[~well_formed] = 0
+    return _luhn_valid(digits), lengths, well_formed, lengths == 0
+
+
+def _read_card_chunks(stream, chunk_size):
+    # Yield lists of lines, one per line of input, without splitting a line
+    # across chunks; spaces, tabs, dashes and \r inside a line are dropped
+    carry = []
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        if isinstance(data, str):
+            data = data.encode("ascii", "replace")
+        end = data.rfind(b"\n")
+        if end < 0:
+            carry.append(data)
+            continue
+        carry.append(data[:end])
+        lines = b"".join(carry).translate(None, _CARD_SEPARATORS).split(b"\n")
+        carry = [data[end + 1 :]]
+        yield lines
+    last = b"".join(carry).translate(None, _CARD_SEPARATORS)
+    if last:
+        yield [last]
+
+
+def cc_check_bulk(source, chunk_size=CARD_CHUNK_SIZE):
+    """
+    Luhn-check many card numbers of 13 to 19 digits at once.
+
+    source can be a NumPy integer array, or a path or open file with one number
+    per line. Spaces and dashes within a number are ignored, so
+    "4111 1111 1111 1111" is one number. Files are read chunk_size bytes at a
+    time and each chunk is checked as a digit matrix, without a Python loop per
+    digit. Numbers of the wrong length, negative values and lines containing
+    anything but digits are malformed and never valid.
+
+    Returns a boolean array (True where the number passes) and a dict of counts:
+    "records", "valid", "invalid", "malformed" and "by_length", the number of
+    well-formed records of each length. For files the array has one entry per
+    line, so entry i is line i + 1; blank lines are False and aren't records.
+    """
+    if np is None:
+        raise ImportError("cc_check_bulk requires NumPy")
+
+    if isinstance(source, np.ndarray):
+        if source.dtype.kind not in "iu":
+            raise TypeError(f"expected an integer array, got {source.dtype}")
+        rows = max(1, chunk_size // 64)
+        flat = source.ravel()
+        batches = (
+            _check_card_ints(flat[i : i + rows]) for i in range(0, len(flat), rows)
+        )
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as stream:
+            return cc_check_bulk(stream, chunk_size)
+    else:
+        batches = map(_check_card_lines, _read_card_chunks(source, chunk_size))
+
+    masks = []
+    by_length = np.zeros(CARD_MAX_DIGITS + 1, dtype=np.int64)
+    malformed = 0
+    blank = 0
+    for luhn, lengths, well_formed, empty in batches:
+        masks.append(well_formed & luhn)
+        by_length += np.bincount(lengths[well_formed], minlength=CARD_MAX_DIGITS + 1)
+        malformed += int((~well_formed & ~empty).sum())
+        blank += int(empty.sum())
+
+    mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    valid = int(mask.sum())
+    records = len(mask) - blank
+    counts = {
+        "records": records,
+        "valid": valid,
+        "invalid": records - valid - malformed,
+        "malformed": malformed,
+        "by_length": {
+            length: int(by_length[length])
+            for length in range(CARD_MIN_DIGITS, CARD_MAX_DIGITS + 1)
+            if by_length[length]
+        },
+    }
+    return mask, counts
@@ -1,3 +1,7 @@
+import io
+import os
+import pathlib
+import tempfile
 import unittest
 import freunds_lab1 as l1
 
@@ -11,6 +15,32 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(l1.nest_egg_2(1234, 100000), 58)
         self.assertEqual(l1.nest_egg_2(6500, 100000), 36)
 
+    def test_nest_egg_rate(self):
+        self.assertAlmostEqual(l1.nest_egg(1000, 2, 0.05), 1102.5)
+        self.assertEqual(l1.nest_egg_2(1000, 2000, 0.05), 15)
+
+    @unittest.skipIf(l1.np is None, "NumPy is not installed")
+    def test_nest_egg_years(self):
+        np = l1.np
+        self.assertEqual(l1.nest_egg_years(1000, 2000), 10)
+        self.assertEqual(l1.nest_egg_years(6500, 100000), 36)
+        self.assertEqual(l1.nest_egg_years(5, 1), 0)
+        investment = np.array([[1000.0], [1234.0], [6500.0]])
+        goal = np.array([500.0, 2000.0, 100000.0])
+        rate = np.array([0.08, 0.05, 0.3])
+        expected = [[l1.nest_egg_2(i, g, r) for g, r in zip(goal, rate)] for i in investment[:, 0]]
+        self.assertEqual(l1.nest_egg_years(investment, goal, rate).tolist(), expected)
+        # Goals on and either side of the loop's own balances
+        balances = [1000.0]
+        for _ in range(40):
+            balances.append(balances[-1] * 1.08)
+        goals = np.array(balances)
+        for goal in (goals, np.nextafter(goals, 0), np.nextafter(goals, np.inf)):
+            expected = [l1.nest_egg_2(1000.0, g) for g in goal]
+            self.assertEqual(l1.nest_egg_years(1000.0, goal).tolist(), expected)
+        self.assertRaises(ValueError, l1.nest_egg_years, 0, 10)
+        self.assertRaises(ValueError, l1.nest_egg_years, 10, 20, 0)
+
     def test_draw_triangle(self):
         self.assertEqual(l1.draw_triangle(1).rstrip(), "*")
         self.assertEqual(l1.draw_triangle(2).rstrip(), "**\n *")
@@ -23,6 +53,34 @@ class MyTestCase(unittest.TestCase):
         self.assertEqual(l1.is_prime(17), True)
         self.assertEqual(l1.is_prime(29), True)
 
+    def test_are_prime(self):
+        def trial_division(n):
+            return n > 1 and all(n % d for d in range(2, int(n ** 0.5) + 1))
+
+        numbers = list(range(-5, 20000))
+        self.assertEqual(l1.are_prime(numbers), [trial_division(n) for n in numbers])
+        self.assertEqual(l1.is_prime(2), False)
+        self.assertEqual(l1.is_prime(10007), True)
+        # Mersenne prime, largest 64-bit prime, Carmichael number, strong pseudoprimes
+        large = [2 ** 61 - 1, 2 ** 64 - 59, 561, 3215031751, 3825123056546413051]
+        self.assertEqual(l1.are_prime(large), [True, True, False, False, False])
+        self.assertEqual(l1.is_prime(2 ** 64 - 59), True)
+        # Strong pseudoprime to every prime base up to 37 (399165290221 * 798330580441)
+        self.assertEqual(l1.is_prime(318665857834031151167461), False)
+        # Past the Miller-Rabin bound are_prime answers by Baillie-PSW instead of trial division
+        huge = [2 ** 89 - 1, 2 ** 521 - 1, l1.MILLER_RABIN_LIMIT, (2 ** 61 - 1) * (2 ** 89 - 1)]
+        self.assertEqual(l1.are_prime(huge), [True, True, False, False])
+        # Strong Lucas pseudoprimes are caught by the base-2 round
+        self.assertEqual([l1.baillie_psw(n) for n in (5459, 5777, 10877)], [False, False, False])
+
+    @unittest.skipIf(l1.np is None, "NumPy is not installed")
+    def test_are_prime_array(self):
+        numbers = l1.np.arange(-5, 20000).reshape(5, -1)
+        expected = l1.are_prime(numbers.ravel().tolist())
+        self.assertEqual(l1.are_prime(numbers).ravel().tolist(), expected)
+        large = l1.np.array([2 ** 64 - 59, 3215031751, 7], dtype=l1.np.uint64)
+        self.assertEqual(l1.are_prime(large).tolist(), [True, False, True])
+
     def test_is_palindrome(self):
         self.assertTrue(l1.is_palindrome('racecar'))
         self.assertTrue(l1.is_palindrome('Racecar'), "Capitalization not correct")
@@ -33,6 +91,28 @@ class MyTestCase(unittest.TestCase):
         self.assertFalse(l1.is_palindrome("Hello there! Welcome to the test suite!"))
         self.assertFalse(l1.is_palindrome("racecarrr"))
 
+    def test_iter_palindromes(self):
+        lines = ["racecar", "Race car", "r.a.c.e,c,a,r", "Sit on a potato pan, Otis.",
+                 "abcdefg", "Hello there! Welcome to the test suite!", "racecarrr",
+                 "Madam, I'm Adam!", "", "x"]
+        expected = [True, True, True, True, False, False, False, True, True, True]
+        data = "\r\n".join(lines).encode()
+        self.assertEqual(list(l1.iter_palindromes(data)), expected)
+        self.assertEqual(list(l1.iter_palindromes(io.BytesIO(data), chunk_size=5)), expected)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "corpus.txt")
+            with open(path, "wb") as file:
+                file.write((data + b"\n") * 50)
+            self.assertEqual(list(l1.iter_palindromes(path, chunk_size=64)), expected * 50)
+            parallel = l1.iter_palindromes(path, workers=2, chunk_size=64)
+            self.assertEqual(list(parallel), expected * 50)
+
+        # multi-byte characters and non-ASCII capitals, next to an ASCII line
+        words = ["é", "éaé", "Ésé", "Ésè", "ßsSS", "Été", "noon"]
+        self.assertEqual([l1.is_palindrome(w) for w in words[:2]], [True, True])
+        data = "\n".join(words).encode() + b"\n"
+        self.assertEqual(list(l1.iter_palindromes(data)), [True, True, True, False, True, True, True])
+
     def test_cc_check(self):
         self.assertTrue(l1.cc_check(2020202020000000))
         self.assertFalse(l1.cc_check(1111111111111111))
@@ -42,5 +122,40 @@ class MyTestCase(unittest.TestCase):
         self.assertFalse(l1.cc_check(5408608073972161))
 
 
+    @unittest.skipIf(l1.np is None, "NumPy is not installed")
+    def test_cc_check_bulk(self):
+        numbers = [2020202020000000, 1111111111111111, 4916832471406208,
+                   3416832471406208, 5408608073972181, 5408608073972161]
+        expected = [l1.cc_check(n) for n in numbers]
+        mask, counts = l1.cc_check_bulk(l1.np.array(numbers, dtype=l1.np.uint64))
+        self.assertEqual(mask.tolist(), expected)
+        self.assertEqual(counts["valid"], 3)
+        self.assertEqual(counts["by_length"], {16: 6})
+
+        # 13, 15 and 19 digits, a 12-digit number, a non-digit and a leading zero
+        lines = "4222222222222\n378282246310005\n6011111111111117001\n\n" \
+                "123456789012\n49168324714062O8\r\n0378282246310005\n"
+        mask, counts = l1.cc_check_bulk(io.StringIO(lines), chunk_size=7)
+        # one entry per line, so the blank fourth line keeps its place
+        self.assertEqual(mask.tolist(), [True, True, False, False, False, False, True])
+        self.assertEqual(counts, {"records": 6, "valid": 3, "invalid": 1, "malformed": 2,
+                                  "by_length": {13: 1, 15: 1, 16: 1, 19: 1}})
+
+        # spaces and dashes group the digits of one number
+        mask, counts = l1.cc_check_bulk(io.BytesIO(b"4916 8324 7140 6208\r\n5408-6080-7397-2161\n4111 1111"))
+        self.assertEqual(mask.tolist(), [True, False, False])
+        self.assertEqual((counts["records"], counts["invalid"], counts["malformed"]), (3, 1, 1))
+
+        # a path, given as a string or a pathlib.Path
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cards.txt")
+            with open(path, "w") as file:
+                file.write(lines)
+            for source in (path, pathlib.Path(path)):
+                mask, counts = l1.cc_check_bulk(source, chunk_size=7)
+                self.assertEqual(mask.tolist(), [True, True, False, False, False, False, True])
+                self.assertEqual(counts["valid"], 3)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -7,13 +7,576 @@ based on codon frequency tables. It reads FASTA files containing gene sequences
 and applies codon optimization to improve or reduce expression levels.
 """
 
+import argparse
+import contextlib
 import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+import operator
 import os
-from typing import Dict, List, Union
+import random
+import re
+import struct
+import sys
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice, repeat
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the vectorized paths need it
+    np = None
+
+OPTIMIZE = "optimize"
+DEOPTIMIZE = "deoptimize"
+SAMPLE = "sample"
+
+
+class RunStats:
+    """
+    Counters and optional stage timings collected while rewriting genes.
+
+    Pass an instance to the rewriting functions to collect numbers instead of
+    per-codon warnings; the caller decides when to report them, for example with
+    unknown_codon_summary() at the end of a run or write_json() for dashboards.
+
+    Attributes:
+        timing (bool): Whether timer() records elapsed time
+        timings (Dict[str, float]): Seconds spent per stage (parse, translate, write)
+        records (int): Genes rewritten
+        codons (int): Codons examined, including a trailing partial codon
+        codons_rewritten (int): Codons replaced by a different codon
+        unknown_codons (Counter): Codons missing from the frequency table, by codon
+        bytes_written (int): Bytes of FASTA output written
+    """
+
+    def __init__(self, timing: bool = False):
+        self.timing = timing
+        self.timings = {}
+        self.records = 0
+        self.codons = 0
+        self.codons_rewritten = 0
+        self.unknown_codons = Counter()
+        self.bytes_written = 0
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Add the time spent inside the with block to a stage, if timing is enabled.
+
+        Args:
+            stage (str): Name of the stage, e.g. "parse", "translate" or "write"
+        """
+        if not self.timing:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+
+    def merge(self, other: "RunStats") -> None:
+        """
+        Add the counters and timings of another RunStats into this one.
+
+        Args:
+            other (RunStats): Statistics collected elsewhere, e.g. by a worker
+        """
+        for stage, seconds in other.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.records += other.records
+        self.codons += other.codons
+        self.codons_rewritten += other.codons_rewritten
+        self.unknown_codons.update(other.unknown_codons)
+        self.bytes_written += other.bytes_written
+
+    def unknown_codon_summary(self) -> Optional[str]:
+        """
+        Describe every unknown codon seen so far in a single warning line.
+
+        Returns:
+            Optional[str]: The warning, or None if every codon was in the table
+        """
+        return _unknown_codon_summary(self.unknown_codons)
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Return the statistics as plain JSON-serialisable values.
+
+        Returns:
+            Dict[str, object]: The counters, unknown codons and timings
+        """
+        return {
+            "records": self.records,
+            "codons": self.codons,
+            "codons_rewritten": self.codons_rewritten,
+            "unknown_codons": dict(self.unknown_codons.most_common()),
+            "bytes_written": self.bytes_written,
+            "timings": dict(self.timings),
+        }
+
+    def write_json(self, path: str) -> None:
+        """
+        Write the statistics to a JSON report.
+
+        Args:
+            path (str): Where to write the report
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+def _unknown_codon_summary(unknown: Counter, limit: int = 10) -> Optional[str]:
+    if not unknown:
+        return None
+    listed = ", ".join(
+        f"'{codon}' x{count}" for codon, count in unknown.most_common(limit)
+    )
+    if len(unknown) > limit:
+        listed += f", ... ({len(unknown) - limit} more)"
+    return (
+        f"Warning: {sum(unknown.values())} codons not found in frequency table "
+        f"({listed}). Using original codons."
+    )
+
+
+def _stage(stats: Optional[RunStats], stage: str):
+    # Times a stage when the caller asked for statistics
+    return stats.timer(stage) if stats is not None else contextlib.nullcontext()
+
+
+def _walker_alias(weights: List[float]) -> Tuple[List[float], List[int]]:
+    """
+    Build a Walker alias table (Vose's method) for sampling in proportion to weights.
+
+    Args:
+        weights (List[float]): Non-negative weights; all zero means uniform
+
+    Returns:
+        Tuple[List[float], List[int]]: Acceptance probability and alias per column
+    """
+    k = len(weights)
+    weights = [max(w, 0.0) for w in weights]
+    total = sum(weights)
+    scaled = [w * k / total for w in weights] if total > 0 else [1.0] * k
+    prob = [1.0] * k
+    alias = list(range(k))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] += scaled[s] - 1.0
+        (small if scaled[l] < 1.0 else large).append(l)
+    # Columns left over hold probability 1 up to rounding error
+    return prob, alias
+
+
+def _alias_draw(codon: str, u: float, samplers) -> str:
+    sampler = samplers.get(codon)
+    if sampler is None:
+        return codon
+    choices, prob, alias = sampler
+    scaled = u * len(choices)
+    column = min(int(scaled), len(choices) - 1)
+    return choices[column] if scaled - column < prob[column] else choices[alias[column]]
+
+
+class CodonPlan:
+    """
+    Precompiled codon substitution maps built once from a codon frequency table.
+
+    Each direction is a flat codon -> replacement mapping, so rewriting a gene is
+    a single dictionary lookup per codon instead of a scan over every amino acid.
+
+    Attributes:
+        codon_freq (Dict[str, List[str]]): The table the plan was compiled from
+        frequencies (Optional[Dict[str, List[Tuple[float, str]]]]): Every
+            (frequency, codon) row per amino acid, ties included, if known
+        optimize (Dict[str, str]): Maps each codon to the most frequent synonymous codon
+        deoptimize (Dict[str, str]): Maps each codon to the least frequent synonymous codon
+    """
+
+    def __init__(
+        self,
+        codon_freq: Dict[str, List[str]],
+        frequencies: Optional[Dict[str, List[Tuple[float, str]]]] = None,
+    ):
+        """
+        Compile the substitution maps from a parsed frequency table.
+
+        Args:
+            codon_freq (Dict[str, List[str]]): Table as returned by parse_freq_table
+            frequencies (Optional[Dict[str, List[Tuple[float, str]]]]): Rows as
+                returned by parse_codon_frequencies, needed by SAMPLE and CaiScorer
+        """
+        self.codon_freq = codon_freq
+        self.frequencies = frequencies
+        self.optimize = {}
+        self.deoptimize = {}
+        for amino_acid in codon_freq:
+            codons = codon_freq[amino_acid]
+            for codon in codons:
+                # The first amino acid listing a codon wins, matching the original scan order
+                if codon not in self.optimize:
+                    self.optimize[codon] = codons[-1]
+                    self.deoptimize[codon] = codons[0]
+
+    @classmethod
+    def from_file(cls, codon_freq_table_file_path: str) -> "CodonPlan":
+        """
+        Build a plan directly from a codon frequency CSV file.
+
+        Args:
+            codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+
+        Returns:
+            CodonPlan: The compiled plan
+        """
+        rows = list(_read_codon_rows(codon_freq_table_file_path))
+        return cls(_freq_table(rows), _codon_frequencies(rows))
+
+    def mapping(self, direction: str) -> Dict[str, str]:
+        """
+        Return the codon substitution map for a direction.
+
+        Args:
+            direction (str): Either OPTIMIZE or DEOPTIMIZE
+
+        Returns:
+            Dict[str, str]: The codon -> replacement mapping
+
+        Raises:
+            ValueError: If the direction is not recognised
+        """
+        if direction == OPTIMIZE:
+            return self.optimize
+        if direction == DEOPTIMIZE:
+            return self.deoptimize
+        raise ValueError(f"Unknown direction: {direction}")
+
+    def apply(
+        self,
+        gene: str,
+        direction: str,
+        stats: Optional[RunStats] = None,
+        seed: Optional[int] = None,
+    ) -> str:
+        """
+        Rewrite a whole gene sequence in one pass.
+
+        Codons missing from the frequency table (including a trailing partial codon)
+        are kept unchanged. They are counted in stats when given; otherwise a single
+        summary warning is printed for the gene. Sequences of at least
+        VECTORIZE_MIN_LENGTH bases use apply_vectorized when NumPy is available.
+
+        Args:
+            gene (str): The gene sequence to rewrite, or a PackedSequence
+            direction (str): OPTIMIZE, DEOPTIMIZE or SAMPLE
+            stats (Optional[RunStats]): Statistics to update
+            seed (Optional[int]): Random seed, used by SAMPLE only
+
+        Returns:
+            str: The rewritten gene sequence
+        """
+        if isinstance(gene, PackedSequence):
+            gene = str(gene)
+        if direction == SAMPLE:
+            return self.apply_sampled(gene, seed, stats)
+        if np is not None and len(gene) >= VECTORIZE_MIN_LENGTH:
+            return self.apply_vectorized(gene, direction, stats)
+        return self._apply_scalar(gene, direction, stats)
+
+    def _apply_scalar(
+        self, gene: str, direction: str, stats: Optional[RunStats] = None
+    ) -> str:
+        table = self.mapping(direction)
+        # Split gene sequence into codons (triplets)
+        codons = [gene[i : i + 3] for i in range(0, len(gene), 3)]
+        rewritten = list(map(table.get, codons, codons))
+
+        # Handle case where codon is not found in frequency table
+        unknown = Counter(codon for codon in codons if codon not in table)
+        if stats is not None:
+            stats.codons += len(codons)
+            stats.codons_rewritten += sum(map(operator.ne, codons, rewritten))
+        self._report_unknown(unknown, stats)
+
+        return "".join(rewritten)
+
+    def apply_vectorized(
+        self, gene: str, direction: str, stats: Optional[RunStats] = None
+    ) -> str:
+        """
+        Rewrite a gene with NumPy by gathering from a 64-entry replacement table.
+
+        Bases are encoded as 2-bit values, each full codon becomes an index 0-63,
+        and every codon is replaced with a single fancy-indexing lookup. Codons
+        containing other symbols (N and other ambiguity codes) are resolved
+        through the regular mapping, so the result matches apply exactly.
+
+        Args:
+            gene (str): The gene sequence to rewrite
+            direction (str): Either OPTIMIZE or DEOPTIMIZE
+            stats (Optional[RunStats]): Statistics to update
+
+        Returns:
+            str: The rewritten gene sequence
+
+        Raises:
+            ImportError: If NumPy is not installed
+        """
+        if np is None:
+            raise ImportError("apply_vectorized requires NumPy")
+
+        table = self.mapping(direction)
+        replacements = self._codon_index_table(direction)
+        if replacements is None or not gene.isascii():
+            # Replacement codons that aren't plain triplets can't live in the byte table
+            return self._apply_scalar(gene, direction, stats)
+        replacement_bytes, known = replacements
+
+        n_codons = len(gene) // 3
+        raw = np.frombuffer(gene.encode("ascii"), dtype=np.uint8)
+        codons = raw[: n_codons * 3].reshape(n_codons, 3)
+        codes = _BASE_CODES[codons]
+        acgt = (codes < 4).all(axis=1)
+        index = (codes[:, 0] * 16 + codes[:, 1] * 4 + codes[:, 2]) & 63
+
+        rewritten = codons.copy()
+        mapped = acgt & known[index]
+        rewritten[mapped] = replacement_bytes[index[mapped]]
+
+        # Codons outside the 2-bit alphabet (ambiguity codes, soft-masked lowercase)
+        # fall back to the dictionary, looking up each distinct codon only once
+        unknown = Counter()
+        unmapped = np.flatnonzero(~mapped)
+        if len(unmapped):
+            rows = codons[unmapped].astype(np.uint32)
+            keys = rows[:, 0] << 16 | rows[:, 1] << 8 | rows[:, 2]
+            distinct, inverse, counts = np.unique(
+                keys, return_inverse=True, return_counts=True
+            )
+            found = np.zeros(len(distinct), dtype=bool)
+            lookup = np.zeros((len(distinct), 3), dtype=np.uint8)
+            for j, key in enumerate(distinct.tolist()):
+                codon = key.to_bytes(3, "big").decode("ascii")
+                if codon in table:
+                    lookup[j] = list(table[codon].encode("ascii"))
+                    found[j] = True
+                else:
+                    unknown[codon] += int(counts[j])
+            hit = found[inverse]
+            rewritten[unmapped[hit]] = lookup[inverse[hit]]
+
+        tail = gene[n_codons * 3 :]
+        if tail and tail not in table:
+            unknown[tail] += 1
+        result = rewritten.tobytes().decode("ascii") + table.get(tail, tail)
+
+        if stats is not None:
+            stats.codons += n_codons + bool(tail)
+            stats.codons_rewritten += int((rewritten != codons).any(axis=1).sum())
+            stats.codons_rewritten += table.get(tail, tail) != tail
+        self._report_unknown(unknown, stats)
+        return result
+
+    @staticmethod
+    def _report_unknown(unknown: Counter, stats: Optional[RunStats]) -> None:
+        if stats is not None:
+            stats.unknown_codons.update(unknown)
+        elif unknown:
+            print(_unknown_codon_summary(unknown))
+
+    def apply_sampled(
+        self, gene: str, seed: Optional[int] = None, stats: Optional[RunStats] = None
+    ) -> str:
+        """
+        Rewrite a gene by drawing each codon from its synonymous codons at random.
+
+        Each codon is replaced with a codon for the same amino acid, chosen with
+        probability proportional to its frequency in the table. Draws come from a
+        precomputed Walker alias table per amino acid, so each costs O(1), and
+        the uniform variates for the whole gene are generated in one batch. The
+        same seed always gives the same sequence (NumPy and pure-Python installs
+        use different generators).
+
+        Args:
+            gene (str): The gene sequence to rewrite, or a PackedSequence
+            seed (Optional[int]): Random seed, None for fresh entropy
+            stats (Optional[RunStats]): Statistics to update
+
+        Returns:
+            str: The rewritten gene sequence
+
+        Raises:
+            ValueError: If the plan was built without codon frequencies
+        """
+        if isinstance(gene, PackedSequence):
+            gene = str(gene)
+        samplers = self._alias_tables()
+        codons = [gene[i : i + 3] for i in range(0, len(gene), 3)]
+        if np is not None:
+            uniforms = np.random.default_rng(seed).random(len(codons))
+            index_tables = self._alias_index_tables()
+            if index_tables is not None and gene.isascii():
+                rewritten = self._sample_vectorized(gene, uniforms, index_tables)
+            else:
+                uniforms = uniforms.tolist()
+                rewritten = list(map(_alias_draw, codons, uniforms, repeat(samplers)))
+        else:
+            rng = random.Random(seed)
+            uniforms = [rng.random() for _ in codons]
+            rewritten = list(map(_alias_draw, codons, uniforms, repeat(samplers)))
+
+        unknown = Counter(codon for codon in codons if codon not in samplers)
+        if stats is not None:
+            stats.codons += len(codons)
+            stats.codons_rewritten += sum(map(operator.ne, codons, rewritten))
+        self._report_unknown(unknown, stats)
+        return "".join(rewritten)
+
+    def _sample_vectorized(self, gene: str, uniforms, index_tables) -> List[str]:
+        group_of_index, sizes, prob, alias, choice_bytes = index_tables
+        n_codons = len(gene) // 3
+        raw = np.frombuffer(gene.encode("ascii"), dtype=np.uint8)
+        codons = raw[: n_codons * 3].reshape(n_codons, 3)
+        codes = _BASE_CODES[codons]
+        acgt = (codes < 4).all(axis=1)
+        index = (codes[:, 0] * 16 + codes[:, 1] * 4 + codes[:, 2]) & 63
+        group = np.where(acgt, group_of_index[index], -1)
+        mapped = group >= 0
+
+        # Walker draw: one uniform picks a column and decides column vs alias
+        group = group[mapped]
+        scaled = uniforms[:n_codons][mapped] * sizes[group]
+        column = np.minimum(scaled.astype(np.int64), sizes[group] - 1)
+        keep = (scaled - column) < prob[group, column]
+        column = np.where(keep, column, alias[group, column])
+
+        rewritten = codons.copy()
+        rewritten[mapped] = choice_bytes[group, column]
+        text = rewritten.tobytes().decode("ascii")
+        result = [text[i : i + 3] for i in range(0, len(text), 3)]
+
+        # Codons outside the 2-bit alphabet and a partial tail use the scalar draw
+        samplers = self._alias_tables()
+        for i in np.flatnonzero(~mapped).tolist():
+            result[i] = _alias_draw(gene[i * 3 : i * 3 + 3], uniforms[i], samplers)
+        if len(gene) % 3:
+            tail = gene[n_codons * 3 :]
+            result.append(_alias_draw(tail, uniforms[n_codons], samplers))
+        return result
+
+    def _alias_tables(self) -> Dict[str, Tuple[List[str], List[float], List[int]]]:
+        # Per codon: its synonymous codons and their alias table, built lazily
+        tables = self.__dict__.get("_alias")
+        if tables is None:
+            if getattr(self, "frequencies", None) is None:
+                raise ValueError(
+                    "Sampling requires a plan built with codon frequencies"
+                )
+            tables = {}
+            for pairs in self.frequencies.values():
+                codons = [codon for freq, codon in pairs]
+                sampler = (codons, *_walker_alias([freq for freq, codon in pairs]))
+                for codon in codons:
+                    # The first amino acid listing a codon wins, as in the maps above
+                    tables.setdefault(codon, sampler)
+            self._alias = tables
+        return tables
+
+    def _alias_index_tables(self):
+        # Alias tables padded into NumPy arrays and looked up by 2-bit codon index;
+        # None if some synonymous codon isn't an ASCII triplet
+        if "_alias_index" not in self.__dict__:
+            samplers = self._alias_tables()
+            groups = list({id(s): s for s in samplers.values()}.values())
+            if not groups or not all(
+                len(c) == 3 and c.isascii() for choices, _, _ in groups for c in choices
+            ):
+                self._alias_index = None
+                return None
+
+            width = max(len(choices) for choices, _, _ in groups)
+            sizes = np.array([len(choices) for choices, _, _ in groups])
+            prob = np.zeros((len(groups), width))
+            alias = np.zeros((len(groups), width), dtype=np.int64)
+            choice_bytes = np.zeros((len(groups), width, 3), dtype=np.uint8)
+            for g, (choices, group_prob, group_alias) in enumerate(groups):
+                prob[g, : len(choices)] = group_prob
+                alias[g, : len(choices)] = group_alias
+                for j, choice in enumerate(choices):
+                    choice_bytes[g, j] = list(choice.encode("ascii"))
+
+            group_ids = {id(s): g for g, s in enumerate(groups)}
+            group_of_index = np.full(64, -1, dtype=np.int64)
+            for i, codon in enumerate(_INDEX_CODONS):
+                if codon in samplers:
+                    group_of_index[i] = group_ids[id(samplers[codon])]
+            self._alias_index = (group_of_index, sizes, prob, alias, choice_bytes)
+        return self._alias_index
+
+    def _codon_index_table(self, direction: str):
+        # Built lazily per direction; None when some replacement isn't an ASCII triplet
+        tables = self.__dict__.setdefault("_index_tables", {})
+        if direction not in tables:
+            table = self.mapping(direction)
+            if all(len(c) == 3 and c.isascii() for c in table.values()):
+                replacement_bytes = np.zeros((64, 3), dtype=np.uint8)
+                known = np.zeros(64, dtype=bool)
+                for i, codon in enumerate(_INDEX_CODONS):
+                    if codon in table:
+                        replacement_bytes[i] = list(table[codon].encode("ascii"))
+                        known[i] = True
+                tables[direction] = (replacement_bytes, known)
+            else:
+                tables[direction] = None
+        return tables[direction]
+
+
+VECTORIZE_MIN_LENGTH = 1000
+
+_INDEX_CODONS = [a + b + c for a in "ACGT" for b in "ACGT" for c in "ACGT"]
+_CODON_INDEX = {codon: i for i, codon in enumerate(_INDEX_CODONS)}
+
+if np is not None:
+    # Maps ASCII bytes to 2-bit base codes; anything other than ACGT becomes 4
+    _BASE_CODES = np.full(256, 4, dtype=np.uint8)
+    for code, base in enumerate(b"ACGT"):
+        _BASE_CODES[base] = code
 
 
 def optimize_gene(
-    gene_id: str, fasta_file_path: str, codon_freq_table_file_path: str
+    gene_id: str,
+    fasta_file_path: Union[str, Mapping[str, "PackedSequence"]],
+    codon_freq_table_file_path: str,
+    stats: Optional[RunStats] = None,
 ) -> Union[str, int]:
     """
     Optimize a gene sequence by replacing codons with the most frequently used codons
@@ -21,52 +584,39 @@ def optimize_gene(
 
     Args:
         gene_id (str): The identifier of the gene to optimize
-        fasta_file_path (str): Path to the FASTA file containing gene sequences
+        fasta_file_path (Union[str, Mapping[str, PackedSequence]]): Path to the FASTA file
+            containing gene sequences, or sequences already loaded by load_packed_fasta
         codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        stats (Optional[RunStats]): Statistics to update instead of printing warnings
 
     Returns:
         str: The optimized gene sequence, or -1 if gene not found
     """
-    fasta = parse_fasta(fasta_file_path)
-    if gene_id not in fasta:
-        return -1
-
-    gene = fasta[gene_id]
-    # Split gene sequence into codons (triplets)
-    codons = [gene[i : i + 3] for i in range(0, len(gene), 3)]
-
-    codon_freq = parse_freq_table(codon_freq_table_file_path)
-    optimized_gene = ""
-
-    for codon in codons:
-        # Find the amino acid for the current codon
-        amino_acid_found = False
-        for amino_acid in codon_freq:
-            if codon in codon_freq[amino_acid]:
-                # Get the most frequent codon (last in sorted list)
-                optimized_gene += codon_freq[amino_acid][-1]
-                amino_acid_found = True
-                break
+    with _stage(stats, "parse"):
+        gene = _lookup_gene(fasta_file_path, gene_id)
+        if gene is None:
+            return -1
+        plan = load_codon_plan(codon_freq_table_file_path)
 
-        # Handle case where codon is not found in frequency table
-        if not amino_acid_found:
-            print(
-                f"Warning: Codon '{codon}' not found in frequency table. Using original codon."
-            )
-            optimized_gene += codon
+    with _stage(stats, "translate"):
+        optimized_gene = plan.apply(gene, OPTIMIZE, stats)
 
     # Write optimized sequence to file
-    output_filename = f"{gene_id}_optimized.fasta"
-    with open(output_filename, "w") as file:
-        file.write(f">{gene_id}\n")
-        file.write(optimized_gene + "\n")
+    with _stage(stats, "write"), FastaWriter(per_gene_suffix="optimized") as writer:
+        output_filename = writer.write(gene_id, optimized_gene)
+    if stats is not None:
+        stats.records += 1
+        stats.bytes_written += writer.bytes_written
 
     print(f"Optimized sequence written to {output_filename}")
     return optimized_gene
 
 
 def deoptimize_gene(
-    gene_id: str, fasta_file_path: str, codon_freq_table_file_path: str
+    gene_id: str,
+    fasta_file_path: Union[str, Mapping[str, "PackedSequence"]],
+    codon_freq_table_file_path: str,
+    stats: Optional[RunStats] = None,
 ) -> Union[str, int]:
     """
     Deoptimize a gene sequence by replacing codons with the least frequently used codons
@@ -74,50 +624,382 @@ def deoptimize_gene(
 
     Args:
         gene_id (str): The identifier of the gene to deoptimize
-        fasta_file_path (str): Path to the FASTA file containing gene sequences
+        fasta_file_path (Union[str, Mapping[str, PackedSequence]]): Path to the FASTA file
+            containing gene sequences, or sequences already loaded by load_packed_fasta
         codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        stats (Optional[RunStats]): Statistics to update instead of printing warnings
 
     Returns:
         str: The deoptimized gene sequence, or -1 if gene not found
     """
-    fasta = parse_fasta(fasta_file_path)
-    if gene_id not in fasta:
-        return -1
-
-    gene = fasta[gene_id]
-    # Split gene sequence into codons (triplets)
-    codons = [gene[i : i + 3] for i in range(0, len(gene), 3)]
-
-    codon_freq = parse_freq_table(codon_freq_table_file_path)
-    deoptimized_gene = ""
-
-    for codon in codons:
-        # Find the amino acid for the current codon
-        amino_acid_found = False
-        for amino_acid in codon_freq:
-            if codon in codon_freq[amino_acid]:
-                # Get the least frequent codon (first in sorted list)
-                deoptimized_gene += codon_freq[amino_acid][0]
-                amino_acid_found = True
-                break
+    with _stage(stats, "parse"):
+        gene = _lookup_gene(fasta_file_path, gene_id)
+        if gene is None:
+            return -1
+        plan = load_codon_plan(codon_freq_table_file_path)
 
-        # Handle case where codon is not found in frequency table
-        if not amino_acid_found:
-            print(
-                f"Warning: Codon '{codon}' not found in frequency table. Using original codon."
-            )
-            deoptimized_gene += codon
+    with _stage(stats, "translate"):
+        deoptimized_gene = plan.apply(gene, DEOPTIMIZE, stats)
 
     # Write deoptimized sequence to file
-    output_filename = f"{gene_id}_deoptimized.fasta"
-    with open(output_filename, "w") as file:
-        file.write(f">{gene_id}\n")
-        file.write(deoptimized_gene + "\n")
+    with _stage(stats, "write"), FastaWriter(per_gene_suffix="deoptimized") as writer:
+        output_filename = writer.write(gene_id, deoptimized_gene)
+    if stats is not None:
+        stats.records += 1
+        stats.bytes_written += writer.bytes_written
 
     print(f"Deoptimized sequence written to {output_filename}")
     return deoptimized_gene
 
 
+def sample_gene(
+    gene_id: str,
+    fasta_file_path: Union[str, Mapping[str, "PackedSequence"]],
+    codon_freq_table_file_path: str,
+    seed: Optional[int] = None,
+    stats: Optional[RunStats] = None,
+) -> Union[str, int]:
+    """
+    Rewrite a gene by sampling synonymous codons in proportion to their frequencies,
+    spreading usage across codons instead of always picking the most frequent one.
+
+    Args:
+        gene_id (str): The identifier of the gene to rewrite
+        fasta_file_path (Union[str, Mapping[str, PackedSequence]]): Path to the FASTA file
+            containing gene sequences, or sequences already loaded by load_packed_fasta
+        codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        seed (Optional[int]): Random seed for a reproducible result
+        stats (Optional[RunStats]): Statistics to update instead of printing warnings
+
+    Returns:
+        str: The sampled gene sequence, or -1 if gene not found
+    """
+    with _stage(stats, "parse"):
+        gene = _lookup_gene(fasta_file_path, gene_id)
+        if gene is None:
+            return -1
+        plan = load_codon_plan(codon_freq_table_file_path)
+
+    with _stage(stats, "translate"):
+        sampled_gene = plan.apply_sampled(gene, _gene_seed(seed, gene_id), stats)
+
+    # Write sampled sequence to file
+    with _stage(stats, "write"), FastaWriter(per_gene_suffix="sampled") as writer:
+        output_filename = writer.write(gene_id, sampled_gene)
+    if stats is not None:
+        stats.records += 1
+        stats.bytes_written += writer.bytes_written
+
+    print(f"Sampled sequence written to {output_filename}")
+    return sampled_gene
+
+
+def _lookup_gene(
+    fasta: Union[str, Mapping[str, "PackedSequence"]], gene_id: str
+) -> Optional[str]:
+    # A path is read through its index; anything else is an in-memory mapping
+    if isinstance(fasta, (str, os.PathLike)):
+        return FastaIndex(fasta).fetch(gene_id)
+    gene = fasta.get(gene_id)
+    return None if gene is None else str(gene)
+
+
+def _gene_lengths(fasta: Union[str, Mapping[str, "PackedSequence"]]) -> Dict[str, int]:
+    if isinstance(fasta, (str, os.PathLike)):
+        return FastaIndex(fasta).lengths()
+    return {gene_id: len(gene) for gene_id, gene in fasta.items()}
+
+
+def _gene_seed(seed: Optional[int], gene_id: str) -> Optional[int]:
+    # Derive a per-gene seed so results don't depend on batching or worker count
+    if seed is None:
+        return None
+    digest = hashlib.sha256(f"{seed}:{gene_id}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+_worker_plan = None
+
+
+def _init_rewrite_worker(plan: CodonPlan) -> None:
+    # Each worker receives the compiled plan once instead of with every chunk
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _rewrite_chunk(
+    direction: str, seed: Optional[int], chunk: List[Tuple[str, str]]
+) -> Tuple[List[str], RunStats]:
+    stats = RunStats()
+    sequences = [
+        _worker_plan.apply(gene, direction, stats, _gene_seed(seed, gene_id))
+        for gene_id, gene in chunk
+    ]
+    stats.records = len(chunk)
+    return sequences, stats
+
+
+def rewrite_genes(
+    gene_ids: Optional[List[str]],
+    fasta_file_path: str,
+    codon_freq_table_file_path: str,
+    direction: str = OPTIMIZE,
+    max_workers: Optional[int] = None,
+    chunk_size: int = 64,
+    use_processes: bool = True,
+    stats: Optional[RunStats] = None,
+    seed: Optional[int] = None,
+) -> Dict[str, Union[str, int]]:
+    """
+    Optimize or deoptimize many genes at once across a worker pool.
+
+    The FASTA file and codon frequency table are read once, and the genes are
+    split into chunks of chunk_size records that are rewritten in parallel.
+    No output files are written.
+
+    Args:
+        gene_ids (Optional[List[str]]): Genes to rewrite, or None for every record
+        fasta_file_path (str): Path to the FASTA file containing gene sequences
+        codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        direction (str): OPTIMIZE, DEOPTIMIZE or SAMPLE
+        max_workers (Optional[int]): Pool size; None uses the executor default, 1 runs inline
+        chunk_size (int): Number of genes per work unit
+        use_processes (bool): Use a ProcessPoolExecutor if True, else a ThreadPoolExecutor
+        stats (Optional[RunStats]): Statistics to update instead of printing warnings
+        seed (Optional[int]): Random seed for SAMPLE; each gene gets its own stream
+                              derived from it, so results are reproducible
+
+    Returns:
+        Dict[str, Union[str, int]]: Rewritten sequences keyed by gene ID, in the order
+                                    requested (file order for None), with -1 for genes
+                                    not found
+    """
+    with _stage(stats, "parse"):
+        plan = load_codon_plan(codon_freq_table_file_path)
+        # Reject unknown directions before doing any work
+        if direction == SAMPLE:
+            plan._alias_tables()
+        else:
+            plan.mapping(direction)
+
+        if gene_ids is None:
+            records = list(parse_fasta(fasta_file_path).items())
+            results = {}
+        else:
+            sequences = FastaIndex(fasta_file_path).fetch_many(gene_ids)
+            records = [(g, gene) for g, gene in sequences.items() if gene is not None]
+            results = {gene_id: -1 for gene_id in sequences}
+
+    chunks = [records[i : i + chunk_size] for i in range(0, len(records), chunk_size)]
+    run_stats = RunStats()
+
+    with _stage(stats, "translate"):
+        if max_workers == 1 or len(chunks) <= 1:
+            _init_rewrite_worker(plan)
+            rewritten = list(map(partial(_rewrite_chunk, direction, seed), chunks))
+        else:
+            pool_type = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+            with pool_type(
+                max_workers, initializer=_init_rewrite_worker, initargs=(plan,)
+            ) as pool:
+                # Executor.map yields in submission order, keeping the output deterministic
+                rewritten = list(
+                    pool.map(partial(_rewrite_chunk, direction, seed), chunks)
+                )
+
+    for chunk, (sequences, chunk_stats) in zip(chunks, rewritten):
+        run_stats.merge(chunk_stats)
+        for (gene_id, gene), sequence in zip(chunk, sequences):
+            results[gene_id] = sequence
+
+    if stats is not None:
+        stats.merge(run_stats)
+    elif run_stats.unknown_codons:
+        print(run_stats.unknown_codon_summary())
+
+    return results
+
+
+CAI_MIN_WEIGHT = 0.01
+
+
+class CaiScorer:
+    """
+    Codon Adaptation Index (CAI) and RSCU scoring against a codon frequency table.
+
+    Each of the 64 codons gets a relative adaptiveness w = frequency / frequency of
+    the most used synonymous codon. A gene's CAI is the geometric mean of w over
+    its codons, computed from a 64-bin codon histogram (numpy.bincount when NumPy
+    is available) rather than a per-codon loop. Stop codons, amino acids with a
+    single codon (Met, Trp) and codons with ambiguity symbols are not scored.
+    Zero-frequency codons use CAI_MIN_WEIGHT so one rare codon can't zero a score.
+
+    Attributes:
+        weights (Dict[str, float]): Relative adaptiveness of each scored codon
+    """
+
+    def __init__(self, plan: CodonPlan):
+        """
+        Derive codon weights from a plan built with frequencies.
+
+        Args:
+            plan (CodonPlan): Plan from load_codon_plan or CodonPlan.from_file
+
+        Raises:
+            ValueError: If the plan was built without codon frequencies
+        """
+        if getattr(plan, "frequencies", None) is None:
+            raise ValueError("CAI scoring requires a plan built with codon frequencies")
+
+        self.weights = {}
+        # Synonymous groups as lists of 2-bit codon indices, for RSCU
+        self._groups = []
+        seen = set()
+        for amino_acid, pairs in plan.frequencies.items():
+            top = max((freq for freq, codon in pairs), default=0)
+            group = []
+            for freq, codon in pairs:
+                # The first amino acid listing a codon wins, as in CodonPlan
+                if codon in seen or codon not in _CODON_INDEX:
+                    continue
+                seen.add(codon)
+                group.append(codon)
+                if amino_acid != "*" and len(pairs) > 1:
+                    w = freq / top if top > 0 else 0.0
+                    self.weights[codon] = max(w, CAI_MIN_WEIGHT)
+            if group:
+                self._groups.append([_CODON_INDEX[codon] for codon in group])
+
+        log_weights = [0.0] * 64
+        scored = [False] * 64
+        for codon, w in self.weights.items():
+            log_weights[_CODON_INDEX[codon]] = math.log(w)
+            scored[_CODON_INDEX[codon]] = True
+        self._log_weights = log_weights
+        self._scored = scored
+        if np is not None:
+            self._log_weights = np.array(log_weights)
+            self._scored = np.array(scored)
+
+    def codon_counts(self, gene: str):
+        """
+        Count the full ACGT codons of a gene.
+
+        Args:
+            gene (str): The gene sequence, or a PackedSequence
+
+        Returns:
+            Counts per codon index 0-63 (a NumPy array when available, else a list)
+        """
+        if isinstance(gene, PackedSequence):
+            gene = str(gene)
+        n_codons = len(gene) // 3
+        if np is not None and gene.isascii():
+            raw = np.frombuffer(gene.encode("ascii"), dtype=np.uint8)
+            codes = _BASE_CODES[raw[: n_codons * 3].reshape(n_codons, 3)]
+            acgt = (codes < 4).all(axis=1)
+            index = codes[acgt, 0] * 16 + codes[acgt, 1] * 4 + codes[acgt, 2]
+            return np.bincount(index, minlength=64)
+
+        counts = [0] * 64
+        for i in range(0, n_codons * 3, 3):
+            index = _CODON_INDEX.get(gene[i : i + 3])
+            if index is not None:
+                counts[index] += 1
+        return counts
+
+    def cai(self, gene: str, counts=None) -> float:
+        """
+        Compute the Codon Adaptation Index of a gene.
+
+        Args:
+            gene (str): The gene sequence
+            counts: Precomputed result of codon_counts(gene), if available
+
+        Returns:
+            float: CAI between 0 and 1, or NaN if the gene has no scored codons
+        """
+        if counts is None:
+            counts = self.codon_counts(gene)
+        if np is not None and isinstance(counts, np.ndarray):
+            total = counts[self._scored].sum()
+            log_sum = float(counts @ self._log_weights)
+        else:
+            total = sum(c for c, s in zip(counts, self._scored) if s)
+            log_sum = sum(c * w for c, w in zip(counts, self._log_weights))
+        return math.exp(log_sum / total) if total else math.nan
+
+    def rscu(self, gene: str, counts=None) -> Dict[str, float]:
+        """
+        Compute the relative synonymous codon usage of every codon in a gene.
+
+        RSCU is the observed count of a codon divided by the count expected if all
+        synonymous codons were used equally; amino acids absent from the gene give 0.
+
+        Args:
+            gene (str): The gene sequence
+            counts: Precomputed result of codon_counts(gene), if available
+
+        Returns:
+            Dict[str, float]: RSCU per codon, in ACGT index order
+        """
+        if counts is None:
+            counts = self.codon_counts(gene)
+        values = [0.0] * 64
+        for group in self._groups:
+            total = sum(int(counts[i]) for i in group)
+            if total:
+                for i in group:
+                    values[i] = counts[i] * len(group) / total
+        return {codon: float(values[i]) for i, codon in enumerate(_INDEX_CODONS)}
+
+
+def score_fasta(
+    source: Union[str, BinaryIO],
+    codon_freq_table_file_path: str,
+    rewrite: Optional[str] = None,
+    seed: Optional[int] = None,
+    rscu: bool = False,
+) -> Iterator[Dict[str, object]]:
+    """
+    Stream CAI scores for every record of a FASTA file.
+
+    Records are read one at a time, so files of any size can be scored. With
+    rewrite set to OPTIMIZE, DEOPTIMIZE or SAMPLE each gene is also rewritten
+    and scored again, giving before/after columns.
+
+    Args:
+        source (Union[str, BinaryIO]): Path to the FASTA file, or a binary stream
+        codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        rewrite (Optional[str]): Direction to rewrite genes in before rescoring
+        seed (Optional[int]): Random seed when rewrite is SAMPLE
+        rscu (bool): Include the 64 RSCU values of the (original) gene
+
+    Returns:
+        Iterator[Dict[str, object]]: One row per gene with gene_id, length, codons,
+                                     cai and, if requested, cai_rewritten and
+                                     RSCU columns
+    """
+    plan = load_codon_plan(codon_freq_table_file_path)
+    scorer = CaiScorer(plan)
+    stats = RunStats()
+
+    for gene_id, gene in iter_fasta(source):
+        counts = scorer.codon_counts(gene)
+        row = {
+            "gene_id": gene_id,
+            "length": len(gene),
+            "codons": len(gene) // 3,
+            "cai": scorer.cai(gene, counts),
+        }
+        if rewrite is not None:
+            rewritten = plan.apply(gene, rewrite, stats, _gene_seed(seed, gene_id))
+            row["cai_rewritten"] = scorer.cai(rewritten)
+        if rscu:
+            row.update(scorer.rscu(gene, counts))
+        yield row
+
+
 def parse_freq_table(codon_freq_table_file_path: str) -> Dict[str, List[str]]:
     """
     Parse a codon frequency table from a CSV file.
@@ -128,6 +1010,10 @@ def parse_freq_table(codon_freq_table_file_path: str) -> Dict[str, List[str]]:
     TTC,F,0.55
     ...
 
+    Codons are keyed by frequency within each amino acid, so when several share
+    a frequency only the last one listed is kept. OPTIMIZE and DEOPTIMIZE have
+    always worked from this table; parse_codon_frequencies keeps every codon.
+
     Args:
         codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
 
@@ -135,8 +1021,60 @@ def parse_freq_table(codon_freq_table_file_path: str) -> Dict[str, List[str]]:
         Dict[str, List[str]]: Dictionary mapping amino acids to lists of codons
                              ordered from least frequent to most frequent
     """
+    return _freq_table(_read_codon_rows(codon_freq_table_file_path))
+
+
+def parse_codon_frequencies(
+    codon_freq_table_file_path: str,
+) -> Dict[str, List[Tuple[float, str]]]:
+    """
+    Parse a codon frequency table, keeping the frequencies and every codon.
+
+    Uses the same CSV format and validation as parse_freq_table, but codons with
+    equal frequencies are all kept, in the order they are listed.
+
+    Args:
+        codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+
+    Returns:
+        Dict[str, List[Tuple[float, str]]]: Dictionary mapping amino acids to
+                                           (frequency, codon) pairs ordered from
+                                           least frequent to most frequent
+    """
+    return _codon_frequencies(_read_codon_rows(codon_freq_table_file_path))
+
+
+def _freq_table(rows: Iterable[Tuple[str, float, str]]) -> Dict[str, List[str]]:
+    codon_freq = {}
+    for amino_acid, freq, codon in rows:
+        if amino_acid not in codon_freq:
+            codon_freq[amino_acid] = {}
+        codon_freq[amino_acid][freq] = codon
+
+    # Convert frequency-codon mappings to sorted lists (least frequent first)
+    return {
+        amino_acid: [codon for freq, codon in sorted(by_freq.items())]
+        for amino_acid, by_freq in codon_freq.items()
+    }
+
+
+def _codon_frequencies(
+    rows: Iterable[Tuple[str, float, str]],
+) -> Dict[str, List[Tuple[float, str]]]:
     codon_freq = {}
+    for amino_acid, freq, codon in rows:
+        codon_freq.setdefault(amino_acid, []).append((freq, codon))
+
+    # A stable sort on frequency alone, so ties keep their file order
+    for amino_acid in codon_freq:
+        codon_freq[amino_acid].sort(key=operator.itemgetter(0))
+    return codon_freq
+
 
+def _read_codon_rows(
+    codon_freq_table_file_path: str,
+) -> Iterator[Tuple[str, float, str]]:
+    # (amino_acid, frequency, codon) for each valid row, warning about the rest
     if not os.path.exists(codon_freq_table_file_path):
         raise FileNotFoundError(
             f"Codon frequency table file not found: {codon_freq_table_file_path}"
@@ -164,74 +1102,883 @@ def parse_freq_table(codon_freq_table_file_path: str) -> Dict[str, List[str]]:
                 )
                 continue
 
-            if amino_acid not in codon_freq:
-                codon_freq[amino_acid] = {}
-            codon_freq[amino_acid][freq] = codon
+            yield amino_acid, freq, codon
 
-    # Convert frequency-codon mappings to sorted codon lists
-    for amino_acid in codon_freq:
-        # Sort by frequency and extract codons (least frequent first)
-        codon_freq[amino_acid] = [
-            codon for freq, codon in sorted(codon_freq[amino_acid].items())
-        ]
 
-    return codon_freq
+FREQ_TABLE_CACHE_SIZE = 16
+PLAN_SIDECAR_SUFFIX = ".plan.json"
+_codon_plan_cache = OrderedDict()
 
 
-def parse_fasta(fasta_file_path: str) -> Dict[str, str]:
+def load_codon_plan(
+    codon_freq_table_file_path: str, use_sidecar: bool = False
+) -> CodonPlan:
     """
-    Parse a FASTA file and return a dictionary of gene sequences.
+    Return the compiled plan for a codon frequency table, reusing earlier work.
+
+    Plans are memoized per process, keyed by the table's path, modification time
+    and size, and the least recently used tables are evicted once more than
+    FREQ_TABLE_CACHE_SIZE are held. With use_sidecar, the parsed table is also
+    saved as JSON to ``<table>.plan.json`` so a fresh process can skip parsing
+    the CSV file; JSON rather than pickle, so a planted sidecar can't run code. The
+    returned plan is shared and must not be modified.
 
     Args:
-        fasta_file_path (str): Path to the FASTA file
+        codon_freq_table_file_path (str): Path to the CSV file containing codon frequencies
+        use_sidecar (bool): Read and write the on-disk sidecar next to the table
 
     Returns:
-        Dict[str, str]: Dictionary mapping gene IDs to their sequences
+        CodonPlan: The compiled plan for the table
+
+    Raises:
+        FileNotFoundError: If the codon frequency table file doesn't exist
+    """
+    if not os.path.exists(codon_freq_table_file_path):
+        raise FileNotFoundError(
+            f"Codon frequency table file not found: {codon_freq_table_file_path}"
+        )
+
+    path = os.path.abspath(codon_freq_table_file_path)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    plan = _codon_plan_cache.get(key)
+    if plan is not None:
+        _codon_plan_cache.move_to_end(key)
+        return plan
+
+    sidecar_path = path + PLAN_SIDECAR_SUFFIX
+    if use_sidecar:
+        plan = _load_plan_sidecar(sidecar_path, key)
+    if plan is None:
+        plan = CodonPlan.from_file(path)
+        if use_sidecar:
+            _save_plan_sidecar(sidecar_path, key, plan)
+
+    # Drop entries for older versions of the same file before adding this one
+    for stale in [k for k in _codon_plan_cache if k[0] == path]:
+        del _codon_plan_cache[stale]
+    _codon_plan_cache[key] = plan
+    while len(_codon_plan_cache) > FREQ_TABLE_CACHE_SIZE:
+        _codon_plan_cache.popitem(last=False)
+
+    return plan
+
+
+def clear_codon_plan_cache() -> None:
+    """
+    Forget every plan memoized by load_codon_plan (on-disk sidecars are kept).
+    """
+    _codon_plan_cache.clear()
+
+
+def _load_plan_sidecar(
+    sidecar_path: str, key: Tuple[str, int, int]
+) -> Optional[CodonPlan]:
+    try:
+        with open(sidecar_path, "r") as file:
+            data = json.load(file)
+        if data.get("stamp") != list(key[1:]):
+            return None
+        frequencies = {
+            amino_acid: [(float(freq), str(codon)) for freq, codon in pairs]
+            for amino_acid, pairs in data["frequencies"].items()
+        }
+        codon_freq = {
+            amino_acid: [str(codon) for codon in codons]
+            for amino_acid, codons in data["codon_freq"].items()
+        }
+        return CodonPlan(codon_freq, frequencies)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def _save_plan_sidecar(
+    sidecar_path: str, key: Tuple[str, int, int], plan: CodonPlan
+) -> None:
+    data = {
+        "stamp": list(key[1:]),
+        "codon_freq": plan.codon_freq,
+        "frequencies": plan.frequencies,
+    }
+    try:
+        with open(sidecar_path, "w") as file:
+            json.dump(data, file)
+    except OSError as e:
+        print(
+            f"Warning: Could not write codon table cache {sidecar_path}: {e}",
+            file=sys.stderr,
+        )
+
+
+FASTA_CHUNK_SIZE = 1 << 20
+GZIP_MAGIC = b"\x1f\x8b"
+BGZF_HEADER_SIZE = 18
+
+
+def _is_bgzf(header: bytes) -> bool:
+    # gzip member with FEXTRA set whose 6-byte extra field is the BGZF 'BC' subfield
+    return (
+        len(header) >= BGZF_HEADER_SIZE
+        and header[:2] == GZIP_MAGIC
+        and header[3] & 4
+        and header[10:16] == b"\x06\x00BC\x02\x00"
+    )
+
+
+def _detect_compression(stream: BinaryIO) -> Optional[str]:
+    # Peeking leaves the stream position untouched, so stdin works too
+    header = stream.peek(BGZF_HEADER_SIZE)[:BGZF_HEADER_SIZE]
+    if _is_bgzf(header):
+        return "bgzf"
+    if header[:2] == GZIP_MAGIC:
+        return "gzip"
+    return None
+
+
+def _bgzf_block_size(header: bytes) -> int:
+    if not _is_bgzf(header):
+        raise ValueError("Malformed BGZF block header")
+    return struct.unpack("<H", header[16:18])[0] + 1
+
+
+def _read_bgzf_blocks(stream: BinaryIO) -> Iterator[Tuple[bytes, int, int]]:
+    # Yields (deflate payload, CRC32, uncompressed size) without inflating anything
+    while True:
+        header = stream.read(BGZF_HEADER_SIZE)
+        if not header:
+            return
+        block_size = _bgzf_block_size(header)
+        body = stream.read(block_size - BGZF_HEADER_SIZE)
+        if len(body) != block_size - BGZF_HEADER_SIZE:
+            raise ValueError("Truncated BGZF block")
+        crc, size = struct.unpack("<II", body[-8:])
+        yield body[:-8], crc, size
+
+
+def _inflate_bgzf_block(payload: bytes, crc: int, size: int) -> bytes:
+    data = zlib.decompress(payload, -15)
+    if len(data) != size or zlib.crc32(data) != crc:
+        raise ValueError("Corrupt BGZF block")
+    return data
+
+
+def iter_bgzf_chunks(
+    stream: BinaryIO, workers: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Decompress a BGZF stream block by block using a pool of worker threads.
+
+    zlib releases the GIL while inflating, so blocks are decompressed in parallel
+    while a bounded window of pending blocks keeps memory use flat. Blocks are
+    yielded in file order.
+
+    Args:
+        stream (BinaryIO): Binary stream positioned at the start of a BGZF block
+        workers (Optional[int]): Number of threads, None for the executor default
+
+    Returns:
+        Iterator[bytes]: The decompressed contents of each block
+
+    Raises:
+        ValueError: If a block is malformed or fails its CRC check
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(workers) as pool:
+        window = 4 * workers
+        pending = deque()
+        for block in _read_bgzf_blocks(stream):
+            pending.append(pool.submit(_inflate_bgzf_block, *block))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _decompressed_chunks(
+    stream: BinaryIO, chunk_size: int, workers: Optional[int]
+) -> Iterator[bytes]:
+    if not hasattr(stream, "peek"):
+        stream = io.BufferedReader(stream)
+
+    compression = _detect_compression(stream)
+    if compression == "bgzf":
+        return iter_bgzf_chunks(stream, workers)
+    if compression == "gzip":
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    # read1 returns whatever one underlying read produced, so records from a pipe
+    # are yielded as they arrive instead of after a full chunk has accumulated
+    read = getattr(stream, "read1", stream.read)
+    return iter(partial(read, chunk_size), b"")
+
+
+def iter_fasta(
+    source: Union[str, BinaryIO],
+    chunk_size: int = FASTA_CHUNK_SIZE,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Stream the records of a FASTA file one at a time.
+
+    The input is read in large chunks and only the record currently being
+    assembled is held in memory, so peak memory is bounded by the largest
+    single record rather than by the size of the file. gzip and BGZF input is
+    recognised by its magic bytes and decompressed on the fly, with BGZF blocks
+    inflated in parallel.
+
+    Args:
+        source (Union[str, BinaryIO]): Path to the FASTA file, or a binary stream
+        chunk_size (int): Number of bytes to read from the input at a time
+        workers (Optional[int]): Threads used to decompress BGZF input
+
+    Returns:
+        Iterator[Tuple[str, str]]: (gene_id, sequence) pairs in file order
 
     Raises:
         FileNotFoundError: If the FASTA file doesn't exist
     """
-    if not os.path.exists(fasta_file_path):
-        raise FileNotFoundError(f"FASTA file not found: {fasta_file_path}")
+    if isinstance(source, (str, os.PathLike)):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"FASTA file not found: {source}")
+        return _iter_fasta_path(source, chunk_size, workers)
+    return _iter_fasta_chunks(_decompressed_chunks(source, chunk_size, workers))
 
-    sequences = {}
-    with open(fasta_file_path, "r") as file:
-        gene_id = None
-        sequence = []
 
-        for line in file:
+def _iter_fasta_path(
+    fasta_file_path: str, chunk_size: int, workers: Optional[int]
+) -> Iterator[Tuple[str, str]]:
+    with open(fasta_file_path, "rb") as file:
+        yield from _iter_fasta_chunks(_decompressed_chunks(file, chunk_size, workers))
+
+
+def _iter_fasta_chunks(chunks: Iterator[bytes]) -> Iterator[Tuple[str, str]]:
+    gene_id = None
+    sequence = []
+    # Pieces of the current incomplete line, joined once its newline arrives, so
+    # a line spanning many chunks (an unwrapped record) is only copied once
+    pending = []
+
+    # None marks the end of input, where a final unterminated line is flushed
+    for chunk in chain(chunks, [None]):
+        if chunk is None:
+            lines = [b"".join(pending)] if pending else []
+        elif not chunk:
+            continue
+        else:
+            end = chunk.rfind(b"\n")
+            if end < 0:
+                pending.append(chunk)
+                continue
+            pending.append(chunk[:end])
+            lines = b"".join(pending).split(b"\n")
+            # Whatever follows the last newline is incomplete; keep it for the next chunk
+            pending = [chunk[end + 1 :]]
+
+        for line in lines:
             line = line.strip()
-            if line.startswith(">"):
-                # Save previous sequence if it exists
+            if line.startswith(b">"):
+                # Emit previous sequence if it exists
                 if gene_id:
-                    sequences[gene_id] = "".join(sequence)
+                    yield gene_id, b"".join(sequence).decode()
                 # Start new sequence
-                gene_id = line[1:]  # Remove '>'
+                gene_id = line[1:].decode()  # Remove '>'
                 sequence = []
-            else:
+            elif gene_id is not None:
                 # Add to current sequence (remove any whitespace)
-                sequence.append(line.replace(" ", "").replace("\t", ""))
+                sequence.append(line.replace(b" ", b"").replace(b"\t", b""))
+
+    # Don't forget the last sequence
+    if gene_id:
+        yield gene_id, b"".join(sequence).decode()
+
 
-        # Don't forget the last sequence
-        if gene_id:
-            sequences[gene_id] = "".join(sequence)
+def parse_fasta(fasta_file_path: str) -> Dict[str, str]:
+    """
+    Parse a FASTA file and return a dictionary of gene sequences.
 
+    Args:
+        fasta_file_path (str): Path to the FASTA file
+
+    Returns:
+        Dict[str, str]: Dictionary mapping gene IDs to their sequences
+
+    Raises:
+        FileNotFoundError: If the FASTA file doesn't exist
+    """
+    sequences = {}
+    for gene_id, sequence in iter_fasta(fasta_file_path):
+        sequences[gene_id] = sequence
     return sequences
 
 
-def menu():
+# Packed sequences hold ACGT at 2 bits per base, first base in the high bits
+_PACK_DIGITS = str.maketrans("ACGTacgt", "01230123")
+_UNPACK_HEX = {
+    ord(digit): "ACGT"[value >> 2] + "ACGT"[value & 3]
+    for value, digit in enumerate("0123456789abcdef")
+}
+_AMBIGUOUS_RUN = re.compile(r"([^ACGTacgt])\1*")
+_LOWERCASE_RUN = re.compile(r"[a-z]+")
+PACKED_BLOCK_SIZE = 3 << 14
+
+
+class PackedSequence:
+    """
+    Read-only nucleotide sequence stored at 2 bits per base.
+
+    A, C, G and T are packed four to a byte in a bytearray, in either case:
+    lowercase (soft-masked) stretches are recorded as (start, end) intervals
+    and lowercased again on decoding. Other symbols (N and other ambiguity
+    codes) are kept in a side list of single-symbol runs, so a long stretch of
+    N or of soft-masked bases costs one entry rather than one per base. Indexing and slicing return str and only decode the bytes
+    they cover; str() decodes the whole sequence in a few C-level passes.
+
+    Attributes:
+        nbytes (int): Bytes used by the packed bases
+    """
+
+    __slots__ = ("_data", "_length", "_starts", "_runs", "_lower_starts", "_lower_ends")
+
+    def __init__(self, sequence: str = ""):
+        """
+        Pack a sequence.
+
+        Args:
+            sequence (str): The bases to store
+        """
+        runs = [
+            (match.start(), match.end() - match.start(), match.group(1))
+            for match in _AMBIGUOUS_RUN.finditer(sequence)
+        ]
+        lower = [match.span() for match in _LOWERCASE_RUN.finditer(sequence)]
+        if runs:
+            # Placeholders keep the packed positions aligned; the runs restore them
+            sequence = _AMBIGUOUS_RUN.sub(
+                lambda match: "A" * len(match.group()), sequence
+            )
+
+        # Base 4 is a power of two, so int() parses the digit string in linear time
+        digits = sequence.translate(_PACK_DIGITS) + "0" * (-len(sequence) % 4)
+        n_bytes = len(digits) // 4
+        self._data = bytearray(
+            int(digits, 4).to_bytes(n_bytes, "big") if n_bytes else b""
+        )
+        self._length = len(sequence)
+        self._starts = [start for start, _, _ in runs]
+        self._runs = runs
+        self._lower_starts = [start for start, _ in lower]
+        self._lower_ends = [end for _, end in lower]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __str__(self) -> str:
+        return self._decode(0, self._length)
+
+    def __repr__(self) -> str:
+        preview = self._decode(0, min(self._length, 20))
+        ellipsis = "..." if self._length > 20 else ""
+        return f"PackedSequence('{preview}{ellipsis}', length={self._length})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PackedSequence):
+            return NotImplemented
+        return (self._length, self._data, self._runs, self._lower_starts) == (
+            other._length,
+            other._data,
+            other._runs,
+            other._lower_starts,
+        ) and self._lower_ends == other._lower_ends
+
+    def __hash__(self) -> int:
+        return hash((self._length, bytes(self._data)))
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return str(self)[key]
+            return self._decode(start, stop)
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("PackedSequence index out of range")
+        return self._decode(key, key + 1)
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, self._length, PACKED_BLOCK_SIZE):
+            yield from self._decode(start, start + PACKED_BLOCK_SIZE)
+
+    def codons(self) -> Iterator[str]:
+        """
+        Iterate over the codons of the sequence, decoding one block at a time.
+
+        Yields:
+            str: Each codon; a trailing partial codon is yielded as is
+        """
+        for start in range(0, self._length, PACKED_BLOCK_SIZE):
+            block = self._decode(start, start + PACKED_BLOCK_SIZE)
+            for i in range(0, len(block), 3):
+                yield block[i : i + 3]
+
+    def _decode(self, start: int, stop: int) -> str:
+        stop = min(stop, self._length)
+        if start >= stop:
+            return ""
+        first = start >> 2
+        text = self._data[first : (stop + 3) >> 2].hex().translate(_UNPACK_HEX)
+        text = text[start - first * 4 :][: stop - start]
+        if self._runs:
+            text = self._apply_runs(text, start, stop)
+        if self._lower_starts:
+            text = self._apply_lowercase(text, start, stop)
+        return text
+
+    def _apply_runs(self, text: str, start: int, stop: int) -> str:
+        pieces = []
+        position = start
+        i = max(bisect_right(self._starts, start) - 1, 0)
+        while i < len(self._runs) and self._runs[i][0] < stop:
+            run_start, run_length, symbol = self._runs[i]
+            i += 1
+            lo = max(run_start, start)
+            hi = min(run_start + run_length, stop)
+            if lo < hi:
+                pieces.append(text[position - start : lo - start])
+                pieces.append(symbol * (hi - lo))
+                position = hi
+        pieces.append(text[position - start :])
+        return "".join(pieces)
+
+    def _apply_lowercase(self, text: str, start: int, stop: int) -> str:
+        pieces = []
+        position = start
+        i = bisect_right(self._lower_ends, start)
+        while i < len(self._lower_starts) and self._lower_starts[i] < stop:
+            lo = max(self._lower_starts[i], start)
+            hi = min(self._lower_ends[i], stop)
+            i += 1
+            pieces.append(text[position - start : lo - start])
+            pieces.append(text[lo - start : hi - start].lower())
+            position = hi
+        pieces.append(text[position - start :])
+        return "".join(pieces)
+
+
+def load_packed_fasta(source: Union[str, BinaryIO]) -> Dict[str, PackedSequence]:
+    """
+    Parse a FASTA file into 2-bit packed sequences.
+
+    Records are packed as they are read, so only one unpacked sequence is held
+    in memory at a time. The result can be passed wherever optimize_gene and
+    deoptimize_gene take a FASTA path.
+
+    Args:
+        source (Union[str, BinaryIO]): Path to the FASTA file, or a binary stream
+
+    Returns:
+        Dict[str, PackedSequence]: Dictionary mapping gene IDs to packed sequences
+
+    Raises:
+        FileNotFoundError: If the FASTA file doesn't exist
+    """
+    return {
+        gene_id: PackedSequence(sequence) for gene_id, sequence in iter_fasta(source)
+    }
+
+
+class FastaIndexEntry(NamedTuple):
+    """
+    Location of one record inside a FASTA file.
+
+    Attributes:
+        name (str): The gene ID (header line without the '>')
+        length (int): Number of bases in the sequence
+        offset (int): Byte offset of the first sequence line
+        line_bases (int): Bases on the first sequence line
+        line_width (int): Bytes on the first sequence line, including the newline
+        byte_length (int): Bytes spanned by all sequence lines of the record
+    """
+
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+    byte_length: int
+
+
+def _read_sidecar(sidecar_path: str, stamp: str) -> Optional[List[str]]:
+    # Returns the rows of a sidecar, or None if it is missing or stale
+    try:
+        with open(sidecar_path, "r") as file:
+            if file.readline().rstrip("\n") != stamp:
+                return None
+            return [line.rstrip("\n") for line in file]
+    except OSError:
+        return None
+
+
+def _write_sidecar(sidecar_path: str, stamp: str, rows: List[Tuple]) -> None:
+    try:
+        with open(sidecar_path, "w") as file:
+            file.write(stamp + "\n")
+            for row in rows:
+                file.write("\t".join(map(str, row)) + "\n")
+    except OSError as e:
+        # A read-only location only costs us the cache, not the index itself
+        print(
+            f"Warning: Could not write FASTA index {sidecar_path}: {e}", file=sys.stderr
+        )
+
+
+class FastaIndex:
+    """
+    faidx-style index giving random access to single records of a FASTA file.
+
+    The index is stored in a sidecar file next to the FASTA file (``<fasta>.idx``)
+    together with the size and modification time of the FASTA file, and is rebuilt
+    automatically whenever either of those changes.
+
+    gzip-compressed files are indexed by uncompressed offset. For BGZF files a
+    second sidecar (``<fasta>.bgzi``) maps uncompressed offsets to compressed
+    blocks, so a record is read by seeking to its first block and inflating only
+    the blocks it spans. Plain gzip has no block structure, so fetching from it
+    still decompresses everything before the record.
+    """
+
+    SUFFIX = ".idx"
+    BLOCKS_SUFFIX = ".bgzi"
+
+    def __init__(
+        self, fasta_file_path: Union[str, os.PathLike], workers: Optional[int] = None
+    ):
+        """
+        Load the sidecar index for a FASTA file, building it if missing or stale.
+
+        Args:
+            fasta_file_path (Union[str, os.PathLike]): Path to the FASTA file
+            workers (Optional[int]): Threads used to inflate records spanning
+                                     several BGZF blocks
+
+        Raises:
+            FileNotFoundError: If the FASTA file doesn't exist
+        """
+        if not os.path.exists(fasta_file_path):
+            raise FileNotFoundError(f"FASTA file not found: {fasta_file_path}")
+
+        fasta_file_path = os.fspath(fasta_file_path)
+        self.fasta_file_path = fasta_file_path
+        self.index_file_path = fasta_file_path + self.SUFFIX
+        self.workers = workers
+        stat = os.stat(fasta_file_path)
+        self._stamp = f"#{stat.st_size}\t{stat.st_mtime_ns}"
+
+        with open(fasta_file_path, "rb") as file:
+            self.compression = _detect_compression(file)
+
+        rows = _read_sidecar(self.index_file_path, self._stamp)
+        if rows is None:
+            entries = self._build()
+            _write_sidecar(self.index_file_path, self._stamp, entries.values())
+        else:
+            entries = {}
+            for row in rows:
+                name, *fields = row.rsplit("\t", 5)
+                entries[name] = FastaIndexEntry(name, *map(int, fields))
+        self.entries = entries
+
+        if self.compression == "bgzf":
+            blocks_file_path = fasta_file_path + self.BLOCKS_SUFFIX
+            rows = _read_sidecar(blocks_file_path, self._stamp)
+            if rows is None:
+                rows = self._scan_blocks()
+                _write_sidecar(blocks_file_path, self._stamp, rows)
+            else:
+                rows = [row.split("\t") for row in rows]
+            self._block_starts = [int(start) for start, offset in rows]
+            self._block_offsets = [int(offset) for start, offset in rows]
+
+    def __contains__(self, gene_id: str) -> bool:
+        return gene_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def fetch(self, gene_id: str) -> Optional[str]:
+        """
+        Read a single sequence by seeking directly to its record.
+
+        Args:
+            gene_id (str): The identifier of the gene to read
+
+        Returns:
+            Optional[str]: The gene sequence, or None if gene not found
+        """
+        return self.fetch_many([gene_id])[gene_id]
+
+    def fetch_many(self, gene_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Read several sequences, opening the FASTA file only once.
+
+        Args:
+            gene_ids (List[str]): The identifiers of the genes to read
+
+        Returns:
+            Dict[str, Optional[str]]: Sequences keyed by gene ID in the order given,
+                                      with None for genes not found
+        """
+        sequences = {}
+        with open(self.fasta_file_path, "rb") as file:
+            if self.compression == "gzip":
+                file = gzip.GzipFile(fileobj=file, mode="rb")
+            for gene_id in gene_ids:
+                entry = self.entries.get(gene_id)
+                if entry is None:
+                    sequences[gene_id] = None
+                    continue
+                if self.compression == "bgzf":
+                    raw = self._read_bgzf(file, entry.offset, entry.byte_length)
+                else:
+                    file.seek(entry.offset)
+                    raw = file.read(entry.byte_length)
+                sequences[gene_id] = "".join(raw.decode().split())
+        return sequences
+
+    def lengths(self) -> Dict[str, int]:
+        """
+        Return the sequence length of every record without reading the FASTA file.
+
+        Returns:
+            Dict[str, int]: Dictionary mapping gene IDs to sequence lengths
+        """
+        return {name: entry.length for name, entry in self.entries.items()}
+
+    def _read_bgzf(self, file: BinaryIO, offset: int, length: int) -> bytes:
+        if length == 0:
+            return b""
+        first = bisect_right(self._block_starts, offset) - 1
+        last = bisect_left(self._block_starts, offset + length)
+        file.seek(self._block_offsets[first])
+        blocks = list(islice(_read_bgzf_blocks(file), last - first))
+
+        if len(blocks) > 1:
+            with ThreadPoolExecutor(self.workers) as pool:
+                data = b"".join(pool.map(_inflate_bgzf_block, *zip(*blocks)))
+        else:
+            data = b"".join(_inflate_bgzf_block(*block) for block in blocks)
+
+        skip = offset - self._block_starts[first]
+        return data[skip : skip + length]
+
+    def _scan_blocks(self) -> List[Tuple[int, int]]:
+        # (uncompressed start, compressed offset) per block, read from headers and
+        # trailers only
+        blocks = []
+        start = 0
+        offset = 0
+        with open(self.fasta_file_path, "rb") as file:
+            while True:
+                header = file.read(BGZF_HEADER_SIZE)
+                if not header:
+                    break
+                block_size = _bgzf_block_size(header)
+                file.seek(offset + block_size - 4)
+                size = struct.unpack("<I", file.read(4))[0]
+                blocks.append((start, offset))
+                start += size
+                offset += block_size
+        return blocks
+
+    def _build(self) -> Dict[str, FastaIndexEntry]:
+        entries = {}
+        with open(self.fasta_file_path, "rb") as file:
+            if self.compression is not None:
+                # Offsets are recorded in uncompressed coordinates
+                file = gzip.GzipFile(fileobj=file, mode="rb")
+            gene_id = None
+            offset = 0
+            record = None
+
+            for raw in file:
+                line = raw.decode().strip()
+                if line.startswith(">"):
+                    if gene_id:
+                        entries[gene_id] = FastaIndexEntry(gene_id, *record)
+                    gene_id = line[1:]
+                    # length, offset, line_bases, line_width, byte_length
+                    record = [0, offset + len(raw), 0, 0, 0]
+                elif record is not None:
+                    bases = len(line.replace(" ", "").replace("\t", ""))
+                    if record[4] == 0:
+                        record[2] = bases
+                        record[3] = len(raw)
+                    record[0] += bases
+                    record[4] = offset + len(raw) - record[1]
+                offset += len(raw)
+
+            if gene_id:
+                entries[gene_id] = FastaIndexEntry(gene_id, *record)
+
+        return entries
+
+
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+class FastaWriter:
+    """
+    Buffered writer that streams many FASTA records into one output.
+
+    Records are collected in memory and flushed in blocks of about buffer_size
+    bytes, sequences can be wrapped at a fixed line width, and the output can be
+    gzip-compressed. In per-gene mode (output=None) every record instead goes to
+    its own ``{gene_id}_{per_gene_suffix}.fasta`` file, as optimize_gene does.
+
+    Use it as a context manager so the final block is flushed and files are closed.
+
+    Attributes:
+        bytes_written (int): Uncompressed bytes written so far
+    """
+
+    def __init__(
+        self,
+        output: Union[str, TextIO, None] = None,
+        line_width: int = 0,
+        compress: bool = False,
+        buffer_size: int = WRITE_BUFFER_SIZE,
+        per_gene_suffix: str = "output",
+    ):
+        """
+        Open the output.
+
+        Args:
+            output (Union[str, TextIO, None]): Path or text stream to write to, or None
+                                                for one file per gene
+            line_width (int): Bases per sequence line, 0 to keep each sequence on one line
+            compress (bool): gzip the output (implied by a path ending in .gz)
+            buffer_size (int): Bytes to collect before writing to the output
+            per_gene_suffix (str): File name suffix used in per-gene mode
+        """
+        self.line_width = line_width
+        self.buffer_size = buffer_size
+        self.per_gene_suffix = per_gene_suffix
+        self.bytes_written = 0
+        self._parts = []
+        self._pending = 0
+        self._owned = []
+
+        if isinstance(output, str):
+            compress = compress or output.endswith(".gz")
+            self._sink = open(output, "wb")
+            self._owned.append(self._sink)
+        elif output is not None:
+            # Text streams are written as text unless compression needs raw bytes
+            self._sink = output.buffer if compress else output
+        else:
+            self._sink = None
+        self.compress = compress
+
+        if self._sink is not None and compress:
+            self._sink = gzip.GzipFile(fileobj=self._sink, mode="wb")
+            self._owned.insert(0, self._sink)
+        self._binary = self._sink is not None and (compress or isinstance(output, str))
+
+    def __enter__(self) -> "FastaWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write(self, gene_id: str, sequence: str) -> Optional[str]:
+        """
+        Add one record to the output.
+
+        Args:
+            gene_id (str): The identifier written on the header line
+            sequence (str): The gene sequence
+
+        Returns:
+            Optional[str]: The file written in per-gene mode, otherwise None
+        """
+        record = f">{gene_id}\n{self._wrap(sequence)}\n"
+
+        if self._sink is None:
+            output_filename = f"{gene_id}_{self.per_gene_suffix}.fasta"
+            if self.compress:
+                output_filename += ".gz"
+                with gzip.open(output_filename, "wt") as file:
+                    file.write(record)
+            else:
+                with open(output_filename, "w") as file:
+                    file.write(record)
+            self.bytes_written += len(record)
+            return output_filename
+
+        self._parts.append(record)
+        self._pending += len(record)
+        if self._pending >= self.buffer_size:
+            self.flush()
+        return None
+
+    def flush(self) -> None:
+        """
+        Write any buffered records to the output.
+        """
+        if not self._parts:
+            return
+        data = "".join(self._parts)
+        self._parts = []
+        self._pending = 0
+        if self._binary:
+            data = data.encode()
+        self._sink.write(data)
+        self.bytes_written += len(data)
+
+    def close(self) -> None:
+        """
+        Flush buffered records and close any files opened by the writer.
+        """
+        if self._sink is not None:
+            self.flush()
+            if not self._owned:
+                self._sink.flush()
+        for file in self._owned:
+            file.close()
+        self._owned = []
+
+    def _wrap(self, sequence: str) -> str:
+        width = self.line_width
+        if width <= 0 or len(sequence) <= width:
+            return sequence
+        return "\n".join(
+            sequence[i : i + width] for i in range(0, len(sequence), width)
+        )
+
+
+def menu(sequences: Optional[Mapping[str, "PackedSequence"]] = None):
     """
     Interactive menu system for gene optimization operations.
+
+    Args:
+        sequences (Optional[Mapping[str, PackedSequence]]): Genes already in memory,
+            e.g. from load_packed_fasta; the FASTA path is asked for if None
     """
     print("Gene Optimization Tool")
     print("=" * 22)
 
     # Get file paths once at the beginning
-    while True:
+    fasta_path = sequences
+    while fasta_path is None:
         fasta_path = input("Enter the path to the FASTA file: ").strip()
         if os.path.exists(fasta_path):
             break
         print(f"Error: File '{fasta_path}' not found. Please try again.")
+        fasta_path = None
 
     while True:
         codon_freq_path = input(
@@ -275,10 +2022,10 @@ def menu():
 
         elif choice == "3":
             try:
-                fasta_data = parse_fasta(fasta_path)
-                print(f"\nAvailable genes ({len(fasta_data)}):")
-                for gene_id in sorted(fasta_data.keys()):
-                    seq_length = len(fasta_data[gene_id])
+                gene_lengths = _gene_lengths(fasta_path)
+                print(f"\nAvailable genes ({len(gene_lengths)}):")
+                for gene_id in sorted(gene_lengths.keys()):
+                    seq_length = gene_lengths[gene_id]
                     print(f"  {gene_id} (length: {seq_length} bp)")
             except Exception as e:
                 print(f"Error reading FASTA file: {e}")
@@ -290,5 +2037,173 @@ def menu():
             print("Invalid choice. Please enter 1, 2, 3, or 4.")
 
 
+def _open_fasta_source(fasta: str) -> Iterator[Tuple[str, str]]:
+    # "-" streams records from stdin so the tool can sit inside a pipeline
+    if fasta == "-":
+        return iter_fasta(sys.stdin.buffer)
+    return iter_fasta(fasta)
+
+
+def _run_rewrite(args: argparse.Namespace, writer: FastaWriter) -> int:
+    stats = RunStats(timing=args.report is not None)
+    wanted = set(args.gene) if args.gene else None
+    found = set()
+
+    # Parser warnings go to stderr so they never end up in the FASTA output
+    with contextlib.redirect_stdout(sys.stderr):
+        with stats.timer("parse"):
+            plan = load_codon_plan(args.table)
+            records = _open_fasta_source(args.fasta)
+
+        while True:
+            with stats.timer("parse"):
+                record = next(records, None)
+            if record is None:
+                break
+            gene_id, gene = record
+            if wanted is not None and gene_id not in wanted:
+                continue
+            found.add(gene_id)
+            with stats.timer("translate"):
+                seed = _gene_seed(getattr(args, "seed", None), gene_id)
+                sequence = plan.apply(gene, args.command, stats, seed)
+            with stats.timer("write"):
+                writer.write(gene_id, sequence)
+            stats.records += 1
+
+    with stats.timer("write"):
+        writer.flush()
+    stats.bytes_written = writer.bytes_written
+
+    summary = stats.unknown_codon_summary()
+    if summary is not None:
+        print(summary, file=sys.stderr)
+    missing = sorted(wanted - found) if wanted is not None else []
+    for gene_id in missing:
+        print(f"Gene '{gene_id}' not found in FASTA file.", file=sys.stderr)
+    if args.report is not None:
+        stats.write_json(args.report)
+    return 1 if missing else 0
+
+
+def _run_score(args: argparse.Namespace, output: TextIO) -> int:
+    source = sys.stdin.buffer if args.fasta == "-" else args.fasta
+    rows = score_fasta(source, args.table, args.rewrite, args.seed, args.rscu)
+    with contextlib.redirect_stdout(sys.stderr):
+        header = None
+        for row in rows:
+            if header is None:
+                header = list(row)
+                output.write("\t".join(header) + "\n")
+            output.write(
+                "\t".join(
+                    f"{value:.6f}" if isinstance(value, float) else str(value)
+                    for value in row.values()
+                )
+                + "\n"
+            )
+    return 0
+
+
+def _run_list(args: argparse.Namespace, output: TextIO) -> int:
+    if args.fasta == "-":
+        records = ((g, len(gene)) for g, gene in _open_fasta_source(args.fasta))
+    else:
+        records = FastaIndex(args.fasta).lengths().items()
+    for gene_id, seq_length in records:
+        output.write(f"{gene_id}\t{seq_length}\n")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Non-interactive command-line entry point.
+
+    Records are streamed from the FASTA input and written as they are processed,
+    so the tool can be used between other programs in a shell pipeline. Running
+    the script without arguments starts the interactive menu instead.
+
+    Args:
+        argv (Optional[List[str]]): Command-line arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Exit status, 1 if any requested gene was not found
+    """
+    parser = argparse.ArgumentParser(description="Gene Optimization Tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command in (OPTIMIZE, DEOPTIMIZE, SAMPLE):
+        sub = subparsers.add_parser(command, help=f"{command} genes from a FASTA file")
+        sub.add_argument("fasta", help="FASTA file path, or - for stdin")
+        sub.add_argument(
+            "-t", "--table", required=True, help="codon frequency table CSV"
+        )
+        sub.add_argument(
+            "-g",
+            "--gene",
+            action="append",
+            help="gene ID to process (repeatable); all records if omitted",
+        )
+        sub.add_argument("-o", "--output", help="output FASTA file (default: stdout)")
+        sub.add_argument(
+            "-w",
+            "--line-width",
+            type=int,
+            default=0,
+            help="wrap sequences at this many bases (default: no wrapping)",
+        )
+        sub.add_argument(
+            "-z", "--gzip", action="store_true", help="gzip-compress the output"
+        )
+        sub.add_argument(
+            "--report", help="write counters and stage timings to this JSON file"
+        )
+        if command == SAMPLE:
+            sub.add_argument(
+                "--seed", type=int, help="random seed for reproducible sampling"
+            )
+
+    sub = subparsers.add_parser("list", help="list genes and their lengths")
+    sub.add_argument("fasta", help="FASTA file path, or - for stdin")
+    sub.add_argument("-o", "--output", help="output file (default: stdout)")
+
+    sub = subparsers.add_parser("score", help="score genes by codon adaptation index")
+    sub.add_argument("fasta", help="FASTA file path, or - for stdin")
+    sub.add_argument("-t", "--table", required=True, help="codon frequency table CSV")
+    sub.add_argument("-o", "--output", help="output TSV file (default: stdout)")
+    sub.add_argument(
+        "--rewrite",
+        choices=(OPTIMIZE, DEOPTIMIZE, SAMPLE),
+        help="also score each gene after rewriting it",
+    )
+    sub.add_argument("--seed", type=int, help="random seed for --rewrite sample")
+    sub.add_argument("--rscu", action="store_true", help="add RSCU columns")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command in ("list", "score"):
+            run = _run_list if args.command == "list" else _run_score
+            if args.output is None:
+                return run(args, sys.stdout)
+            with open(args.output, "w") as output:
+                return run(args, output)
+
+        with FastaWriter(
+            args.output or sys.stdout, line_width=args.line_width, compress=args.gzip
+        ) as writer:
+            return _run_rewrite(args, writer)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); stop quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     menu()
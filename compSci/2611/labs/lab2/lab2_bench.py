@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Gene Optimization Tool
+
+Generates a seeded synthetic genome and codon frequency table, times each stage
+of freunds_lab2 against them, and reports throughput and peak memory. Results are
+written as JSON and can be compared against a stored baseline so regressions fail
+loudly instead of going unnoticed.
+
+Example:
+    python lab2_bench.py --records 2000 --output results.json
+    python lab2_bench.py --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import freunds_lab2 as l2
+
+# Standard genetic code, codons enumerated in TCAG order
+BASES = "TCAG"
+AMINO_ACIDS = "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"
+GENETIC_CODE = {
+    a + b + c: AMINO_ACIDS[i]
+    for i, (a, b, c) in enumerate(
+        (a, b, c) for a in BASES for b in BASES for c in BASES
+    )
+}
+
+
+def synthetic_fasta(
+    path: str,
+    records: int,
+    mean_length: int = 1500,
+    sd_length: int = 500,
+    seed: int = 0,
+    line_width: int = 60,
+) -> Dict[str, int]:
+    """
+    Write a reproducible FASTA file of random open reading frames.
+
+    Lengths are drawn from a normal distribution, rounded to whole codons and
+    clamped to at least one codon. Each record starts with ATG and ends with a
+    stop codon.
+
+    Args:
+        path (str): Where to write the FASTA file
+        records (int): Number of records to generate
+        mean_length (int): Mean sequence length in bases
+        sd_length (int): Standard deviation of the sequence length in bases
+        seed (int): Random seed
+        line_width (int): Bases per sequence line
+
+    Returns:
+        Dict[str, int]: Totals for the file ("records", "bases", "codons", "bytes")
+    """
+    rng = random.Random(seed)
+    sense = [codon for codon, aa in GENETIC_CODE.items() if aa != "*"]
+    stops = [codon for codon, aa in GENETIC_CODE.items() if aa == "*"]
+    bases = 0
+
+    with open(path, "w") as file:
+        for i in range(records):
+            n_codons = max(1, round(rng.gauss(mean_length, sd_length) / 3))
+            body = rng.choices(sense, k=max(0, n_codons - 2))
+            sequence = ("ATG" + "".join(body) + rng.choice(stops))[: n_codons * 3]
+            bases += len(sequence)
+            file.write(f">GENE{i:06d} synthetic\n")
+            for j in range(0, len(sequence), line_width):
+                file.write(sequence[j : j + line_width] + "\n")
+
+    return {
+        "records": records,
+        "bases": bases,
+        "codons": bases // 3,
+        "bytes": os.path.getsize(path),
+    }
+
+
+def synthetic_codon_table(path: str, seed: int = 0) -> None:
+    """
+    Write a reproducible codon frequency table covering all 64 codons.
+
+    Frequencies are distinct within each amino acid, so parse_freq_table, which
+    keeps one codon per frequency, has every codon to optimize from.
+
+    Args:
+        path (str): Where to write the CSV file
+        seed (int): Random seed
+    """
+    rng = random.Random(seed)
+    frequencies = rng.sample(range(1, 10000), len(GENETIC_CODE))
+    with open(path, "w") as file:
+        file.write("Codon,Amino Acid,Frequency\n")
+        for (codon, aa), freq in zip(GENETIC_CODE.items(), frequencies):
+            file.write(f"{codon},{aa},{freq / 100}\n")
+
+
+def measure(
+    stage: Callable[[], object],
+    repeat: int = 3,
+    traced: Optional[Callable[[], object]] = None,
+) -> Dict[str, float]:
+    """
+    Time a stage and record its peak Python memory allocation.
+
+    The best of repeat timed runs is reported; peak memory comes from one extra
+    run under tracemalloc so tracing overhead doesn't distort the timings.
+    tracemalloc only sees this process, so stages that fan out to worker
+    processes pass traced, an in-process equivalent whose peak is recorded.
+
+    Args:
+        stage (Callable[[], object]): Zero-argument callable running the stage
+        repeat (int): Number of timed runs
+        traced (Optional[Callable[[], object]]): Callable to trace instead of stage
+
+    Returns:
+        Dict[str, float]: "seconds" and "peak_bytes" for the stage
+    """
+    timings = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stage()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            (traced or stage)()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run_benchmarks(
+    records: int = 2000,
+    mean_length: int = 1500,
+    sd_length: int = 500,
+    sample_genes: int = 50,
+    seed: int = 0,
+    repeat: int = 3,
+) -> Dict[str, object]:
+    """
+    Generate synthetic inputs and benchmark every stage of the gene tool.
+
+    optimize_gene and deoptimize_gene handle one gene per call, so they are timed
+    over the first sample_genes records; rewrite_genes covers the whole genome.
+
+    Args:
+        records (int): Number of synthetic FASTA records
+        mean_length (int): Mean sequence length in bases
+        sd_length (int): Standard deviation of the sequence length in bases
+        sample_genes (int): Genes passed to the single-gene functions
+        seed (int): Random seed for the synthetic inputs
+        repeat (int): Timed runs per stage
+
+    Returns:
+        Dict[str, object]: Run parameters and per-stage results
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta_path = os.path.join(tmp, "synthetic.fasta")
+        table_path = os.path.join(tmp, "synthetic_codon_freqs.csv")
+        totals = synthetic_fasta(fasta_path, records, mean_length, sd_length, seed)
+        synthetic_codon_table(table_path, seed)
+
+        fasta = l2.parse_fasta(fasta_path)
+        sample = list(fasta)[:sample_genes]
+        sample_codons = sum(len(fasta[g]) for g in sample) // 3
+        table_bytes = os.path.getsize(table_path)
+        l2.FastaIndex(fasta_path)  # Build the sidecar outside the timed runs
+
+        def single_gene(function):
+            return lambda: [function(g, fasta_path, table_path) for g in sample]
+
+        def batch(direction, max_workers=None):
+            return lambda: l2.rewrite_genes(
+                None, fasta_path, table_path, direction, max_workers=max_workers
+            )
+
+        # (name, callable, input bytes, codons processed)
+        stages = [
+            ("parse_fasta", lambda: l2.parse_fasta(fasta_path), totals["bytes"], 0),
+            (
+                "parse_freq_table",
+                lambda: l2.parse_freq_table(table_path),
+                table_bytes,
+                0,
+            ),
+            ("optimize_gene", single_gene(l2.optimize_gene), 0, sample_codons),
+            ("deoptimize_gene", single_gene(l2.deoptimize_gene), 0, sample_codons),
+            ("rewrite_genes", batch(l2.OPTIMIZE), totals["bytes"], totals["codons"]),
+        ]
+        # The worker pool's memory is invisible to tracemalloc; trace an inline run
+        traced = {"rewrite_genes": batch(l2.OPTIMIZE, max_workers=1)}
+
+        results = {}
+        # optimize_gene writes its output files to the working directory
+        os.chdir(tmp)
+        try:
+            for name, stage, n_bytes, n_codons in stages:
+                result = measure(stage, repeat, traced.get(name))
+                if n_bytes:
+                    result["mb_per_s"] = n_bytes / 1e6 / result["seconds"]
+                if n_codons:
+                    result["codons_per_s"] = n_codons / result["seconds"]
+                results[name] = result
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "params": {
+            "records": records,
+            "mean_length": mean_length,
+            "sd_length": sd_length,
+            "sample_genes": sample_genes,
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "input": totals,
+        "stages": results,
+    }
+
+
+def compare(
+    results: Dict[str, object], baseline: Dict[str, object], threshold: float
+) -> List[str]:
+    """
+    List the throughput figures that fell, and the peak memory figures that
+    grew, by more than threshold relative to the baseline.
+
+    Args:
+        results (Dict[str, object]): Output of run_benchmarks
+        baseline (Dict[str, object]): Earlier output of run_benchmarks
+        threshold (float): Allowed relative change, e.g. 0.1 for 10%
+
+    Returns:
+        List[str]: One message per regression; empty if there are none
+    """
+    regressions = []
+    for name, result in results["stages"].items():
+        reference = baseline["stages"].get(name, {})
+        for metric in ("mb_per_s", "codons_per_s"):
+            if metric not in result or metric not in reference:
+                continue
+            change = result[metric] / reference[metric] - 1
+            if change < -threshold:
+                regressions.append(
+                    f"{name} {metric}: {result[metric]:.4g} vs baseline "
+                    f"{reference[metric]:.4g} ({change:+.1%})"
+                )
+        if reference.get("peak_bytes") and "peak_bytes" in result:
+            change = result["peak_bytes"] / reference["peak_bytes"] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{name} peak_bytes: {result['peak_bytes']:,} vs baseline "
+                    f"{reference['peak_bytes']:,} ({change:+.1%})"
+                )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the benchmarks from the command line.
+
+    Args:
+        argv (List[str]): Command-line arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Exit status, 1 if a regression against the baseline was found
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the gene optimization tool")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--mean-length", type=int, default=1500)
+    parser.add_argument("--sd-length", type=int, default=500)
+    parser.add_argument("--sample-genes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed relative throughput drop or memory growth (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.records,
+        args.mean_length,
+        args.sd_length,
+        args.sample_genes,
+        args.seed,
+        args.repeat,
+    )
+
+    for name, result in results["stages"].items():
+        throughput = ", ".join(
+            f"{result[m]:,.1f} {label}"
+            for m, label in (("mb_per_s", "MB/s"), ("codons_per_s", "codons/s"))
+            if m in result
+        )
+        print(
+            f"{name:<18} {result['seconds']:8.4f} s  "
+            f"peak {result['peak_bytes'] / 1e6:8.2f} MB  {throughput}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
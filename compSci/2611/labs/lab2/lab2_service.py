@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Gene Optimization Service
+
+Loads FASTA files and codon frequency tables once and serves optimize, deoptimize,
+sample, list and score requests over localhost HTTP or a Unix socket. The event
+loop only parses requests and looks up genes; rewriting and scoring run in a
+worker pool that holds its own copy of the compiled codon plans, so concurrent
+requests don't wait on each other or re-read anything from disk.
+
+Endpoints (GET with query parameters, or POST with a JSON object body):
+    /health                      Loaded files and request counters
+    /genes?fasta=NAME            Gene IDs and lengths
+    /optimize?gene=ID            Optimized sequence(s); also /deoptimize, /sample
+    /score?gene=ID&rscu=1        CAI (and RSCU) of the stored sequence(s)
+
+gene may be repeated, or a list in a JSON body. fasta and table name a loaded
+file and may be omitted when only one is loaded; sample also accepts seed.
+
+Example:
+    python lab2_service.py -f Scer.fasta -t Scer_codon_freqs.csv --port 8642
+    curl 'http://127.0.0.1:8642/optimize?gene=YAL001C'
+    python lab2_service.py -f Scer.fasta -t Scer_codon_freqs.csv --unix /tmp/genes.sock
+    curl --unix-socket /tmp/genes.sock 'http://localhost/genes'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import freunds_lab2 as l2
+
+# Genes per work unit sent to the pool
+SERVICE_CHUNK_SIZE = 64
+MAX_BODY_SIZE = 64 << 20
+MAX_HEADER_LINES = 100
+
+
+class ServiceError(Exception):
+    """A request that can't be served, carrying the HTTP status to reply with."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+_service_plans = {}
+_service_scorers = {}
+
+
+def _init_service_worker(tables: Dict[str, str]) -> None:
+    # Each worker compiles the plans once at startup instead of per request
+    for name, path in tables.items():
+        plan = l2.load_codon_plan(path)
+        _service_plans[name] = plan
+        _service_scorers[name] = l2.CaiScorer(plan)
+
+
+def _service_rewrite(
+    table: str, direction: str, seed: Optional[int], chunk: List[Tuple[str, str]]
+) -> Tuple[List[str], l2.RunStats]:
+    stats = l2.RunStats()
+    plan = _service_plans[table]
+    sequences = [
+        plan.apply(gene, direction, stats, l2._gene_seed(seed, gene_id))
+        for gene_id, gene in chunk
+    ]
+    stats.records = len(chunk)
+    return sequences, stats
+
+
+def _service_score(
+    table: str, rscu: bool, chunk: List[Tuple[str, str]]
+) -> List[Dict[str, object]]:
+    scorer = _service_scorers[table]
+    rows = []
+    for gene_id, gene in chunk:
+        counts = scorer.codon_counts(gene)
+        cai = scorer.cai(gene, counts)
+        # NaN isn't valid JSON
+        row = {"cai": None if cai != cai else cai}
+        if rscu:
+            row["rscu"] = scorer.rscu(gene, counts)
+        rows.append(row)
+    return rows
+
+
+class GeneService:
+    """
+    In-memory gene store and request dispatcher for the optimization service.
+
+    Attributes:
+        fastas (Dict[str, Dict[str, l2.PackedSequence]]): Sequences of each loaded
+                                                          FASTA file by gene ID
+        tables (Dict[str, str]): Paths of the loaded codon frequency tables by name
+        stats (l2.RunStats): Totals across every rewrite served
+        requests (int): Number of requests handled
+    """
+
+    def __init__(
+        self,
+        fastas: Dict[str, str],
+        tables: Dict[str, str],
+        max_workers: Optional[int] = None,
+        use_processes: bool = True,
+    ):
+        """
+        Load the FASTA files and codon tables and start the worker pool.
+
+        Args:
+            fastas (Dict[str, str]): FASTA file paths keyed by the name clients use
+            tables (Dict[str, str]): Codon frequency table paths keyed by name
+            max_workers (Optional[int]): Pool size; None uses the executor default
+            use_processes (bool): Use a ProcessPoolExecutor if True, else a ThreadPoolExecutor
+
+        Raises:
+            ValueError: If no FASTA file or no codon table is given
+        """
+        if not fastas or not tables:
+            raise ValueError("at least one FASTA file and one codon table are required")
+
+        # Packed at 2 bits per base so several genomes fit in memory at once
+        self.fastas = {
+            name: l2.load_packed_fasta(path) for name, path in fastas.items()
+        }
+        self.tables = dict(tables)
+        self.stats = l2.RunStats()
+        self.requests = 0
+        self.started = time.time()
+
+        # Compile the plans here too, so a bad table fails at startup, not per request
+        for path in self.tables.values():
+            l2.CaiScorer(l2.load_codon_plan(path))
+
+        pool_type = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self.pool: Executor = pool_type(
+            max_workers, initializer=_init_service_worker, initargs=(self.tables,)
+        )
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        self.pool.shutdown()
+
+    def __enter__(self) -> "GeneService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    async def handle(
+        self, method: str, target: str, body: bytes = b""
+    ) -> Tuple[HTTPStatus, object]:
+        """
+        Serve one request.
+
+        Args:
+            method (str): HTTP method, GET or POST
+            target (str): Request path and query string
+            body (bytes): Request body; a JSON object for POST
+
+        Returns:
+            Tuple[HTTPStatus, object]: Status and JSON-serializable reply
+        """
+        self.requests += 1
+        try:
+            route, params = self._parse(method, target, body)
+            if route == "/health":
+                return HTTPStatus.OK, self._health()
+            if route == "/genes":
+                genes = self._fasta(params)
+                return HTTPStatus.OK, [
+                    {"gene_id": gene_id, "length": len(gene)}
+                    for gene_id, gene in genes.items()
+                ]
+            if route in ("/optimize", "/deoptimize", "/sample"):
+                return HTTPStatus.OK, await self._rewrite(route[1:], params)
+            if route == "/score":
+                return HTTPStatus.OK, await self._score(params)
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"no such endpoint: {route}")
+        except ServiceError as error:
+            return error.status, {"error": str(error)}
+
+    @staticmethod
+    def _parse(method: str, target: str, body: bytes) -> Tuple[str, Dict[str, object]]:
+        url = urlsplit(target)
+        params = {
+            key: values if key == "gene" else values[-1]
+            for key, values in parse_qs(url.query).items()
+        }
+        if method == "POST" and body:
+            try:
+                payload = json.loads(body)
+            except ValueError as error:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {error}")
+            if not isinstance(payload, dict):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+            params.update(payload)
+        elif method not in ("GET", "POST"):
+            raise ServiceError(
+                HTTPStatus.METHOD_NOT_ALLOWED, f"unsupported method {method}"
+            )
+        return url.path.rstrip("/") or "/", params
+
+    def _health(self) -> Dict[str, object]:
+        return {
+            "fastas": {name: len(genes) for name, genes in self.fastas.items()},
+            "tables": sorted(self.tables),
+            "requests": self.requests,
+            "uptime": time.time() - self.started,
+            "stats": self.stats.to_dict(),
+        }
+
+    @staticmethod
+    def _choose(loaded: Dict[str, object], name: Optional[str], kind: str) -> str:
+        if name is not None and not isinstance(name, str):
+            raise ServiceError(HTTPStatus.BAD_REQUEST, f"{kind} must be a name")
+        if name is None:
+            if len(loaded) != 1:
+                raise ServiceError(
+                    HTTPStatus.BAD_REQUEST,
+                    f"several {kind}s are loaded; choose one of {sorted(loaded)}",
+                )
+            return next(iter(loaded))
+        if name not in loaded:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"{kind} {name!r} is not loaded")
+        return name
+
+    def _fasta(self, params: Dict[str, object]) -> Dict[str, l2.PackedSequence]:
+        return self.fastas[self._choose(self.fastas, params.get("fasta"), "fasta")]
+
+    def _genes(
+        self, params: Dict[str, object]
+    ) -> Tuple[List[Tuple[str, str]], List[str]]:
+        gene_ids = params.get("gene")
+        if isinstance(gene_ids, str):
+            gene_ids = [gene_ids]
+        if not gene_ids:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "gene is required")
+        if not isinstance(gene_ids, list) or not all(
+            isinstance(g, str) for g in gene_ids
+        ):
+            raise ServiceError(
+                HTTPStatus.BAD_REQUEST, "gene must be a gene ID or a list of them"
+            )
+        genes = self._fasta(params)
+        found = [(g, genes[g]) for g in dict.fromkeys(gene_ids) if g in genes]
+        missing = [g for g in dict.fromkeys(gene_ids) if g not in genes]
+        return found, missing
+
+    async def _map(
+        self, function, records: List[Tuple[str, str]]
+    ) -> List[Tuple[List[Tuple[str, str]], object]]:
+        # Fan the genes out in chunks and pair each chunk with its result, in order
+        loop = asyncio.get_running_loop()
+        chunks = [
+            records[i : i + SERVICE_CHUNK_SIZE]
+            for i in range(0, len(records), SERVICE_CHUNK_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.pool, function, chunk) for chunk in chunks)
+        )
+        return list(zip(chunks, results))
+
+    async def _rewrite(
+        self, direction: str, params: Dict[str, object]
+    ) -> Dict[str, object]:
+        table = self._choose(self.tables, params.get("table"), "table")
+        seed = params.get("seed")
+        if seed is not None:
+            try:
+                seed = int(seed)
+            except (TypeError, ValueError):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "seed must be an integer")
+
+        found, missing = self._genes(params)
+        worker = partial(_service_rewrite, table, direction, seed)
+
+        sequences = {}
+        stats = l2.RunStats()
+        for chunk, (chunk_sequences, chunk_stats) in await self._map(worker, found):
+            stats.merge(chunk_stats)
+            for (gene_id, _), sequence in zip(chunk, chunk_sequences):
+                sequences[gene_id] = sequence
+        self.stats.merge(stats)
+
+        return {
+            "sequences": sequences,
+            "missing": missing,
+            "unknown_codons": dict(stats.unknown_codons),
+        }
+
+    async def _score(self, params: Dict[str, object]) -> Dict[str, object]:
+        table = self._choose(self.tables, params.get("table"), "table")
+        rscu = params.get("rscu") in (True, "1", "true", "yes")
+        found, missing = self._genes(params)
+        scores = {}
+        for chunk, rows in await self._map(partial(_service_score, table, rscu), found):
+            for (gene_id, _), row in zip(chunk, rows):
+                scores[gene_id] = row
+        return {"scores": scores, "missing": missing}
+
+
+async def _read_request(
+    reader: asyncio.StreamReader,
+) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    # readline raises ValueError once a line outgrows the stream's buffer limit
+    try:
+        line = await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise ServiceError(HTTPStatus.REQUEST_URI_TOO_LONG, "request line too long")
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        try:
+            line = await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            raise ServiceError(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "header line too long"
+            )
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ServiceError(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "too many headers"
+        )
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if length > MAX_BODY_SIZE:
+        raise ServiceError(
+            HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large"
+        )
+    body = await reader.readexactly(length) if length else b""
+    if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+        headers["connection"] = "close"
+    return method, target, headers, body
+
+
+def _write_response(
+    writer: asyncio.StreamWriter, status: HTTPStatus, reply: object, keep_alive: bool
+) -> None:
+    body = json.dumps(reply).encode() + b"\n"
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+async def handle_connection(
+    service: GeneService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """
+    Serve HTTP/1.1 requests from one client until it disconnects.
+
+    Args:
+        service (GeneService): The service answering the requests
+        reader (asyncio.StreamReader): Client input stream
+        writer (asyncio.StreamWriter): Client output stream
+    """
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ServiceError as error:
+                _write_response(writer, error.status, {"error": str(error)}, False)
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            keep_alive = headers.get("connection", "").lower() != "close"
+            try:
+                status, reply = await service.handle(method, target, body)
+            except Exception as error:
+                # e.g. BrokenProcessPool after a worker died; the client still gets a reply
+                print(f"{method} {target} failed: {error!r}", file=sys.stderr)
+                status = HTTPStatus.INTERNAL_SERVER_ERROR
+                reply = {"error": "internal server error"}
+            _write_response(writer, status, reply, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(
+    service: GeneService,
+    host: str = "127.0.0.1",
+    port: int = 8642,
+    unix_socket: Optional[str] = None,
+    ready: Optional[asyncio.Future] = None,
+) -> None:
+    """
+    Run the service until cancelled.
+
+    Args:
+        service (GeneService): The service answering the requests
+        host (str): Address to listen on; keep the default to stay local
+        port (int): TCP port, 0 to pick a free one
+        unix_socket (Optional[str]): Listen on this Unix socket path instead of TCP
+        ready (Optional[asyncio.Future]): Set to the listening address once bound
+    """
+
+    def connected(reader, writer):
+        return handle_connection(service, reader, writer)
+
+    if unix_socket is not None:
+        server = await asyncio.start_unix_server(connected, path=unix_socket)
+    else:
+        server = await asyncio.start_server(connected, host, port)
+
+    address = server.sockets[0].getsockname()
+    if ready is not None:
+        ready.set_result(address)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if unix_socket is not None and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+
+def _named_paths(values: List[str]) -> Dict[str, str]:
+    # NAME=PATH, or just PATH named after the file
+    named = {}
+    for value in values:
+        name, sep, path = value.partition("=")
+        if not sep:
+            path = value
+            name = os.path.splitext(os.path.basename(value))[0]
+        named[name] = path
+    return named
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Run the service from the command line.
+
+    Args:
+        argv (List[str]): Command-line arguments, defaults to sys.argv[1:]
+
+    Returns:
+        int: Exit status
+    """
+    parser = argparse.ArgumentParser(description="Serve the gene optimization tool")
+    parser.add_argument(
+        "-f",
+        "--fasta",
+        action="append",
+        required=True,
+        help="FASTA file, as [NAME=]PATH",
+    )
+    parser.add_argument(
+        "-t",
+        "--table",
+        action="append",
+        required=True,
+        help="codon table, as [NAME=]PATH",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--unix", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("-j", "--workers", type=int, help="worker pool size")
+    parser.add_argument(
+        "--threads", action="store_true", help="use threads instead of processes"
+    )
+    args = parser.parse_args(argv)
+
+    with GeneService(
+        _named_paths(args.fasta),
+        _named_paths(args.table),
+        args.workers,
+        not args.threads,
+    ) as service:
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            ready = loop.create_future()
+            task = asyncio.ensure_future(
+                serve(service, args.host, args.port, args.unix, ready)
+            )
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, task.cancel)
+                except (NotImplementedError, RuntimeError):
+                    pass  # Not supported on Windows; Ctrl+C still raises KeyboardInterrupt
+            address = await ready
+            print(f"Serving on {address}", file=sys.stderr)
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        try:
+            asyncio.run(run())
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,32 @@
 import unittest
+import contextlib
+import gzip
+import io
+import json
 import os
+import pathlib
+import shutil
+import struct
+import tempfile
+import threading
+import tracemalloc
+import zlib
+from collections import Counter
 import freunds_lab2 as l2
+
+
+def bgzf_compress(data, block_size=16):
+    # Minimal BGZF writer: one deflate stream per block plus the standard EOF block
+    blocks = []
+    for i in range(0, len(data), block_size):
+        part = data[i : i + block_size]
+        deflate = zlib.compressobj(6, zlib.DEFLATED, -15)
+        payload = deflate.compress(part) + deflate.flush()
+        header = b"\x1f\x8b\x08\x04\0\0\0\0\0\xff\x06\0BC\x02\0" + struct.pack("<H", len(payload) + 25)
+        blocks.append(header + payload + struct.pack("<II", zlib.crc32(part), len(part)))
+    blocks.append(bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000"))
+    return b"".join(blocks)
+
 class MyTestCase(unittest.TestCase):
     def test_optimize(self):
         optimized = "ATGAGCATTAAAGGCGATAGCCCGAGCAGCACCAACGCGAGCAGCAGCCCGAAAAGCACCTATAGCATTCAGAGCGATGATAAAGCGAACCTGGGCAGCGGCAACGTGGATATTCGCACCGATAACAGCCAGCAGGATAGCAACAACCGCCGCGATATTGTGGTGGTGACCCGCGTGGCGAGCGAAGAAACCCTGGAAAGCCAGAGCAGCACCAGCAGCATGGGCATTCGCCCGGAAAGCAGCTTTAACTATGAAGATGCGAGCAACCAGGCGCGCGTGGAAATGAACAACCGCGTGCATGGCAGCAACATGAACACCATTAACAAATATTATCCGGTGCGCTTTCCGAAAAACAACGAACGCCAGCTGAGCGATACCAACAACCTGAACGAAAAAGTGCAGGGCACCCATACCGTGCAGAGCAGCACCCAGGAAGATAAAATTCTGGATGGCGATACCAGCAACAGCCAGGTGACCCCGAGCCTGAACATTGCGGAATTTCCGACCGATAAACTGCTGAAAATGCTGACCGCGCTGCTGACCAAAATTATTAAAAGCAACGATCGCACCGCGGCGACCAACCCGAGCCTGACCCAGGAAATTGAAAACGGCCGCTGCCTGGCGCTGAGCGATAACGAAAAAAAATATCTGAGCCCGGTGCTGGGCTTTCGCGGCAAACATGTGCCGCAGATTGGCCTGGATCAGTATTTTCAGCGCATTCAGAAATATTGCCCGACCACCAACGATGTGTTTCTGAGCCTGCTGGTGTATTTTGATCGCATTAGCAAACGCTGCAACAGCGTGACCACCACCCCGAAAACCAACACCGCGAAACATGAAAGCCCGAGCAACGAAAGCAGCCTGGATAAAGCGAACCGCGGCGCGGATAAAATGAGCGCGTGCAACAGCAACGAAAACAACGAAAACGATGATAGCGATGATGAAAACACCGGCGTGCAGCGCGATAGCCGCGCGCATCCGCAGATGTTTGTGATGGATAGCCATAACATTCATCGCCTGATTATTGCGGGCATTACCGTGAGCACCAAATTTCTGAGCGATTTTTTTTATAGCAACAGCCGCTATAGCCGCGTGGGCGGCATTAGCCTGCAGGAACTGAACCATCTGGAACTGCAGTTTCTGGTGCTGTGCGATTTTGAACTGCTGATTAGCGTGAACGAACTGCAGCGCTATGCGGATCTGCTGTATCGCTTTTGGAACAACGCGAAAGCGCAGAGCCAGGCGCTGGTGACCGGCATGTAA"
@@ -27,6 +53,459 @@ class MyTestCase(unittest.TestCase):
             self.assertEqual(deoptimized, content[1].rstrip())
 
 
+    def test_codon_plan(self):
+        plan = l2.CodonPlan.from_file("Ecol_codon_freqs.csv")
+        self.assertEqual(64, len(plan.optimize))
+        self.assertEqual(64, len(plan.deoptimize))
+        # unknown and trailing partial codons are kept as-is
+        self.assertEqual("CTGAAAGCGNNNAT", plan.apply("TTAAAGGCTNNNAT", l2.OPTIMIZE))
+        self.assertEqual("CTAAAGGCTNNNAT", plan.apply("CTGAAAGCGNNNAT", l2.DEOPTIMIZE))
+        self.assertRaises(ValueError, plan.apply, "ATG", "sideways")
+
+    def test_fasta_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                file.write(">g1 first\nATGAAA\nTTT\n>g2\nCCC\n")
+            index = l2.FastaIndex(path)
+            self.assertTrue(os.path.exists(path + ".idx"))
+            self.assertEqual({"g1 first": 9, "g2": 3}, index.lengths())
+            self.assertEqual("ATGAAATTT", index.fetch("g1 first"))
+            self.assertIsNone(index.fetch("ABCDE"))
+
+            # the sidecar is rebuilt once the FASTA file changes
+            with open(path, "a") as file:
+                file.write(">g3\nGGGG\n")
+            index = l2.FastaIndex(path)
+            self.assertEqual("GGGG", index.fetch("g3"))
+            self.assertEqual(l2.parse_fasta(path), {g: index.fetch(g) for g in index.entries})
+
+            # path-like arguments work, and a sidecar that can't be written only
+            # warns on stderr, keeping the listing on stdout clean
+            os.remove(path + ".idx")
+            os.mkdir(path + ".idx")
+            self.assertEqual("GGGG", l2.FastaIndex(pathlib.Path(path)).fetch("g3"))
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                self.assertEqual(0, l2.main(["list", path]))
+            self.assertEqual("g1 first\t9\ng2\t3\ng3\t4\n", stdout.getvalue())
+            self.assertIn("Warning: Could not write FASTA index", stderr.getvalue())
+
+    def test_iter_fasta(self):
+        data = b">g1 first\nATGAAA\nTTT\n\n>g2\r\nCC C\r\n>g3\nGG"
+        expected = [("g1 first", "ATGAAATTT"), ("g2", "CCC"), ("g3", "GG")]
+        # tiny chunks force records and lines to straddle chunk boundaries
+        for chunk_size in (1, 4, 1 << 20):
+            self.assertEqual(expected, list(l2.iter_fasta(io.BytesIO(data), chunk_size)))
+        self.assertRaises(FileNotFoundError, l2.iter_fasta, "missing.fasta")
+
+        # a record from a pipe is yielded once the next header arrives, without
+        # waiting for a whole chunk or for the writer to close
+        read_end, write_end = os.pipe()
+        records = []
+        with os.fdopen(read_end, "rb", buffering=0) as stream, os.fdopen(write_end, "wb", buffering=0) as writer:
+            first = threading.Thread(target=lambda: records.append(next(l2.iter_fasta(stream))), daemon=True)
+            writer.write(b">g1\nATG\n>g2\nCC")
+            first.start()
+            first.join(5)
+            self.assertEqual([("g1", "ATG")], records)
+        self.assertFalse(first.is_alive())
+
+    def test_rewrite_genes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                for i in range(10):
+                    file.write(f">g{i}\nTTAAAGGCT{'CTG' * i}\n")
+            plan = l2.CodonPlan.from_file("Ecol_codon_freqs.csv")
+            fasta = l2.parse_fasta(path)
+            expected = {g: plan.apply(seq, l2.DEOPTIMIZE) for g, seq in fasta.items()}
+
+            for use_processes in (True, False):
+                results = l2.rewrite_genes(
+                    None, path, "Ecol_codon_freqs.csv", l2.DEOPTIMIZE,
+                    max_workers=2, chunk_size=3, use_processes=use_processes,
+                )
+                self.assertEqual(list(expected.items()), list(results.items()))
+
+            results = l2.rewrite_genes(["g7", "ABCDE", "g2"], path, "Ecol_codon_freqs.csv")
+            self.assertEqual(["g7", "ABCDE", "g2"], list(results))
+            self.assertEqual(plan.apply(fasta["g7"], l2.OPTIMIZE), results["g7"])
+            self.assertEqual(-1, results["ABCDE"])
+
+    def test_load_codon_plan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "freqs.csv")
+            shutil.copy("Ecol_codon_freqs.csv", path)
+            l2.clear_codon_plan_cache()
+
+            plan = l2.load_codon_plan(path, use_sidecar=True)
+            self.assertIs(plan, l2.load_codon_plan(path))
+            self.assertEqual(l2.parse_freq_table(path), plan.codon_freq)
+            self.assertTrue(os.path.exists(path + ".plan.json"))
+
+            # a cold cache is served from the sidecar
+            l2.clear_codon_plan_cache()
+            cold = l2.load_codon_plan(path, use_sidecar=True)
+            self.assertIsNot(plan, cold)
+            self.assertEqual(plan.optimize, cold.optimize)
+            self.assertEqual(plan.frequencies, cold.frequencies)
+
+            # an unreadable sidecar is ignored and rewritten
+            with open(path + ".plan.json", "wb") as file:
+                file.write(b"\x80\x04garbage")
+            l2.clear_codon_plan_cache()
+            self.assertEqual(plan.optimize, l2.load_codon_plan(path, use_sidecar=True).optimize)
+
+            # editing the table invalidates both the memo and the sidecar
+            with open(path, "a") as file:
+                file.write("\nNNN,X,1.0\n")
+            self.assertEqual("NNN", l2.load_codon_plan(path, use_sidecar=True).optimize["NNN"])
+            self.assertRaises(FileNotFoundError, l2.load_codon_plan, "missing.csv")
+
+    @unittest.skipIf(l2.np is None, "NumPy not installed")
+    def test_apply_vectorized(self):
+        plan = l2.CodonPlan.from_file("Ecol_codon_freqs.csv")
+        gene = "ATGTTAAAGNNNGCTRCGTGG" * 100 + "GC"
+        for direction in (l2.OPTIMIZE, l2.DEOPTIMIZE):
+            self.assertEqual(plan._apply_scalar(gene, direction), plan.apply_vectorized(gene, direction))
+        self.assertEqual("CTGNNNGCG", plan.apply_vectorized("TTANNNGCT", l2.OPTIMIZE))
+        # soft-masked (lowercase) stretches go through the dictionary, with the same counts
+        masked = "ATGttaaagNNNGCTttaTGG" * 100
+        scalar_stats, vector_stats = l2.RunStats(), l2.RunStats()
+        self.assertEqual(plan._apply_scalar(masked, l2.OPTIMIZE, scalar_stats), plan.apply_vectorized(masked, l2.OPTIMIZE, vector_stats))
+        self.assertEqual(scalar_stats.unknown_codons, vector_stats.unknown_codons)
+        self.assertEqual(scalar_stats.codons_rewritten, vector_stats.codons_rewritten)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            out_path = os.path.join(tmp, "out.fasta")
+            with open(path, "w") as file:
+                file.write(">g1\nTTAAAG\n>g2\nGCTNNN\n")
+
+            self.assertEqual(0, l2.main(["optimize", path, "-t", "Ecol_codon_freqs.csv", "-o", out_path]))
+            with open(out_path) as file:
+                self.assertEqual(">g1\nCTGAAA\n>g2\nGCGNNN\n", file.read())
+
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                status = l2.main(["deoptimize", path, "-t", "Ecol_codon_freqs.csv", "-g", "g2", "-g", "ABCDE"])
+                l2.main(["list", path])
+            self.assertEqual(1, status)
+            self.assertEqual(">g2\nGCTNNN\ng1\t6\ng2\t6\n", stdout.getvalue())
+            self.assertIn("1 codons not found in frequency table ('NNN' x1)", stderr.getvalue())
+            self.assertIn("Gene 'ABCDE' not found", stderr.getvalue())
+
+    def test_fasta_writer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.fasta.gz")
+            with l2.FastaWriter(path, line_width=4, buffer_size=8) as writer:
+                writer.write("g1", "ATGAAATTT")
+                writer.write("g2", "")
+                writer.write("g3", "CCC")
+            with gzip.open(path, "rt") as file:
+                self.assertEqual(">g1\nATGA\nAATT\nT\n>g2\n\n>g3\nCCC\n", file.read())
+            self.assertEqual(29, writer.bytes_written)
+
+            stream = io.StringIO()
+            with l2.FastaWriter(stream) as writer:
+                writer.write("g1", "ATGAAATTT")
+                self.assertEqual("", stream.getvalue())
+            self.assertEqual(">g1\nATGAAATTT\n", stream.getvalue())
+
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                with l2.FastaWriter(per_gene_suffix="optimized") as writer:
+                    self.assertEqual("g1_optimized.fasta", writer.write("g1", "ATG"))
+                with open("g1_optimized.fasta") as file:
+                    self.assertEqual(">g1\nATG\n", file.read())
+            finally:
+                os.chdir(cwd)
+
+    def test_compressed_fasta(self):
+        data = b">g1 first\nATGAAATTTCCCGGGAAATTTCCC\nTTT\n>g2\nCCC\n"
+        expected = {"g1 first": "ATGAAATTTCCCGGGAAATTTCCCTTT", "g2": "CCC"}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, content in (("genes.fa.gz", gzip.compress(data)), ("genes.fa.bgz", bgzf_compress(data))):
+                path = os.path.join(tmp, name)
+                with open(path, "wb") as file:
+                    file.write(content)
+                self.assertEqual(expected, l2.parse_fasta(path))
+                self.assertEqual(expected, dict(l2.iter_fasta(io.BytesIO(content), workers=2)))
+                index = l2.FastaIndex(path, workers=2)
+                self.assertEqual(expected, index.fetch_many(list(expected)))
+
+            self.assertEqual("bgzf", index.compression)
+            self.assertTrue(os.path.exists(path + ".bgzi"))
+
+    def test_run_stats(self):
+        plan = l2.CodonPlan.from_file("Ecol_codon_freqs.csv")
+        applies = [plan._apply_scalar] + ([plan.apply_vectorized] if l2.np is not None else [])
+        for apply in applies:
+            stats = l2.RunStats()
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                self.assertEqual("CTGAAANNNGCGNNNAT", apply("TTAAAANNNGCTNNNAT", l2.OPTIMIZE, stats))
+            self.assertEqual("", stdout.getvalue())
+            self.assertEqual(6, stats.codons)
+            self.assertEqual(2, stats.codons_rewritten)
+            self.assertEqual({"NNN": 2, "AT": 1}, stats.unknown_codons)
+
+        # without stats, a single summary line replaces the per-codon warnings
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            plan.apply("NNNNNNAT", l2.OPTIMIZE)
+        self.assertEqual(1, len(stdout.getvalue().splitlines()))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            report = os.path.join(tmp, "report.json")
+            with open(path, "w") as file:
+                file.write(">g1\nTTAAAG\n>g2\nGCTNNN\n")
+            stats = l2.RunStats(timing=True)
+            l2.rewrite_genes(None, path, "Ecol_codon_freqs.csv", max_workers=1, stats=stats)
+            self.assertEqual((2, 4, 3), (stats.records, stats.codons, stats.codons_rewritten))
+            self.assertIn("translate", stats.timings)
+
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                l2.main(["optimize", path, "-t", "Ecol_codon_freqs.csv", "-o", os.path.join(tmp, "out.fa"), "--report", report])
+            with open(report) as file:
+                data = json.load(file)
+            self.assertEqual({"NNN": 1}, data["unknown_codons"])
+            self.assertEqual(os.path.getsize(os.path.join(tmp, "out.fa")), data["bytes_written"])
+            self.assertEqual({"parse", "translate", "write"}, set(data["timings"]))
+
+    def test_sampling(self):
+        plan = l2.load_codon_plan("Ecol_codon_freqs.csv")
+        gene = "CTG" * 20000 + "NNNTGG"
+        sampled = plan.apply_sampled(gene, seed=7)
+        self.assertEqual(sampled, plan.apply(gene, l2.SAMPLE, seed=7))
+        self.assertNotEqual(sampled, plan.apply_sampled(gene, seed=8))
+        # synonymous codons only, in proportion to their frequencies
+        counts = Counter(sampled[i : i + 3] for i in range(0, 60000, 3))
+        self.assertEqual(set(plan.codon_freq["L"]), set(counts))
+        self.assertAlmostEqual(52.1 / 105.69, counts["CTG"] / 20000, delta=0.02)
+        self.assertTrue(sampled.endswith("NNNTGG"))
+
+        prob, alias = l2._walker_alias([1.0, 3.0])
+        self.assertEqual(([0.5, 1.0], [1, 1]), (prob, alias))
+        self.assertRaises(ValueError, l2.CodonPlan(plan.codon_freq).apply_sampled, "CTG")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                for i in range(6):
+                    file.write(f">g{i}\n{'CTGAAAGGC' * 10}\n")
+            first = l2.rewrite_genes(None, path, "Ecol_codon_freqs.csv", l2.SAMPLE, max_workers=1, seed=3)
+            second = l2.rewrite_genes(None, path, "Ecol_codon_freqs.csv", l2.SAMPLE, max_workers=2, chunk_size=2, seed=3)
+            self.assertEqual(first, second)
+
+            # Codons with equal frequencies are all kept for sampling
+            tied_path = os.path.join(tmp, "tied.csv")
+            with open(tied_path, "w") as file:
+                file.write("Codon,Amino Acid,Frequency\nAAA,K,1\nAAG,K,1\nCTG,L,10\nCTA,L,10\nCTT,L,5\n")
+            self.assertEqual({"K": ["AAG"], "L": ["CTT", "CTA"]}, l2.parse_freq_table(tied_path))
+            self.assertEqual([(5.0, "CTT"), (10.0, "CTG"), (10.0, "CTA")], l2.parse_codon_frequencies(tied_path)["L"])
+            sampled = l2.CodonPlan.from_file(tied_path).apply_sampled("CTG" * 300 + "AAA" * 300, seed=1)
+            self.assertEqual({"CTG", "CTA", "CTT", "AAA", "AAG"}, {sampled[i : i + 3] for i in range(0, 1800, 3)})
+
+    def test_cai(self):
+        plan = l2.load_codon_plan("Ecol_codon_freqs.csv")
+        scorer = l2.CaiScorer(plan)
+        optimized = plan.apply("CTGCTAAAAGGCATGTGG", l2.OPTIMIZE)
+        self.assertAlmostEqual(1.0, scorer.cai(optimized))
+        # ATG/TGG and ambiguous codons are not scored
+        self.assertAlmostEqual(scorer.cai("CTA"), scorer.cai("CTAATGTGGNNN"))
+        self.assertTrue(scorer.cai("ATGTGG") != scorer.cai("ATGTGG"))
+        self.assertLess(scorer.cai(plan.apply("CTGAAAGGC", l2.DEOPTIMIZE)), 0.5)
+        rscu = scorer.rscu("CTGCTGCTA")
+        self.assertAlmostEqual(4.0, rscu["CTG"])
+        self.assertAlmostEqual(0.0, rscu["AAA"])
+        self.assertRaises(ValueError, l2.CaiScorer, l2.CodonPlan(plan.codon_freq))
+
+        # Tied synonymous codons are both fully adapted, not dropped as unscored
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tied.csv")
+            with open(path, "w") as file:
+                file.write("Codon,Amino Acid,Frequency\nAAA,K,1\nAAG,K,1\nCTG,L,10\nCTA,L,10\nCTT,L,5\n")
+            tied = l2.CaiScorer(l2.CodonPlan.from_file(path))
+            self.assertEqual({"AAA": 1.0, "AAG": 1.0, "CTG": 1.0, "CTA": 1.0, "CTT": 0.5}, tied.weights)
+            self.assertAlmostEqual(1.0, tied.cai("AAGAAA"))
+            self.assertAlmostEqual(0.5 ** 0.5, tied.cai("CTTCTG"))
+            self.assertAlmostEqual(1.0, tied.rscu("AAGAAA")["AAA"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                file.write(">a\nCTGCTA\n>b\n" + "CTAAAG" * 400 + "\n")
+            rows = list(l2.score_fasta(path, "Ecol_codon_freqs.csv", l2.OPTIMIZE))
+            self.assertEqual(["a", "b"], [row["gene_id"] for row in rows])
+            self.assertEqual(800, rows[1]["codons"])
+            self.assertAlmostEqual(scorer.cai("CTAAAG" * 400), rows[1]["cai"])
+            self.assertAlmostEqual(1.0, rows[1]["cai_rewritten"])
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(0, l2.main(["score", path, "-t", "Ecol_codon_freqs.csv", "--rscu"]))
+            lines = output.getvalue().splitlines()
+            self.assertEqual(["gene_id", "length", "codons", "cai"], lines[0].split("\t")[:4])
+            self.assertEqual(68, len(lines[1].split("\t")))
+
+    def test_service(self):
+        import asyncio
+        import lab2_service
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                file.write(">a\nCTGCTA\n>b\nAAAGGCNNN\n")
+            plan = l2.load_codon_plan("Ecol_codon_freqs.csv")
+            tables = {"ecol": "Ecol_codon_freqs.csv"}
+
+            with lab2_service.GeneService({"g": path}, tables, 2, False) as service:
+                async def exchange():
+                    ready = asyncio.get_running_loop().create_future()
+                    server = asyncio.ensure_future(lab2_service.serve(service, port=0, ready=ready))
+                    host, port = await ready
+                    reader, writer = await asyncio.open_connection(host, port)
+                    replies = []
+                    body = json.dumps({"gene": ["b", "zz", "a"]}).encode()
+                    requests = [
+                        b"GET /genes HTTP/1.1\r\n\r\n",
+                        b"POST /deoptimize HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body),
+                        b"GET /score?gene=a&rscu=1 HTTP/1.1\r\n\r\n",
+                        b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n",
+                    ]
+                    async def reply(reader):
+                        status = int((await reader.readline()).split()[1])
+                        headers = {}
+                        while True:
+                            line = (await reader.readline()).strip()
+                            if not line:
+                                break
+                            name, _, value = line.decode().partition(":")
+                            headers[name.lower()] = value.strip()
+                        return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+                    for request in requests:  # one keep-alive connection
+                        writer.write(request)
+                        replies.append(await reply(reader))
+                    writer.close()
+
+                    # a malformed request gets an error reply, not a dropped connection
+                    for bad in (b"abc", b"-5"):
+                        reader, writer = await asyncio.open_connection(host, port)
+                        writer.write(b"POST /optimize HTTP/1.1\r\nContent-Length: %s\r\n\r\n" % bad)
+                        replies.append(await reply(reader))
+                        writer.close()
+                    for body in ({"gene": 5}, {"gene": {"a": 1}}, {"gene": "a", "fasta": ["g"]}, {"gene": "a", "table": 1}):
+                        replies.append(await service.handle("POST", "/optimize", json.dumps(body).encode()))
+                    # lines past the 64 KiB stream limit, and a worker pool that has gone away
+                    long = b"x" * (1 << 17)
+                    service.pool.shutdown()
+                    for request in (b"GET /genes?" + long + b" HTTP/1.1\r\n\r\n",
+                                    b"GET /genes HTTP/1.1\r\nX-Long: " + long + b"\r\n\r\n",
+                                    b"GET /score?gene=a HTTP/1.1\r\n\r\n"):
+                        reader, writer = await asyncio.open_connection(host, port)
+                        writer.write(request)
+                        replies.append(await reply(reader))
+                        writer.close()
+                    server.cancel()
+                    return replies
+
+                genes, rewritten, scored, missing, *malformed, too_long, too_large, failed = asyncio.run(exchange())
+
+            self.assertEqual((200, [{"gene_id": "a", "length": 6}, {"gene_id": "b", "length": 9}]), genes)
+            self.assertEqual(200, rewritten[0])
+            self.assertEqual(["b", "a"], list(rewritten[1]["sequences"]))
+            self.assertEqual(plan.apply("CTGCTA", l2.DEOPTIMIZE), rewritten[1]["sequences"]["a"])
+            self.assertEqual(["zz"], rewritten[1]["missing"])
+            self.assertEqual({"NNN": 1}, rewritten[1]["unknown_codons"])
+            self.assertAlmostEqual(l2.CaiScorer(plan).cai("CTGCTA"), scored[1]["scores"]["a"]["cai"])
+            self.assertEqual(64, len(scored[1]["scores"]["a"]["rscu"]))
+            self.assertEqual(404, missing[0])
+            self.assertEqual([400] * 6, [status for status, _ in malformed])
+            self.assertEqual({"error": "invalid Content-Length"}, malformed[0][1])
+            self.assertEqual({"error": "fasta must be a name"}, malformed[4][1])
+            self.assertEqual((414, 431), (too_long[0], too_large[0]))
+            self.assertEqual((500, {"error": "internal server error"}), failed)
+
+    def test_packed_sequence(self):
+        sequence = "ATGNNNNNCGTacgRT" * 3 + "GA"
+        packed = l2.PackedSequence(sequence)
+        self.assertEqual(sequence, str(packed))
+        self.assertEqual(len(sequence), len(packed))
+        self.assertEqual(13, packed.nbytes)
+        for start, stop in ((0, 5), (3, 9), (-7, None), (10, 10), (40, 99)):
+            self.assertEqual(sequence[start:stop], packed[start:stop])
+        self.assertEqual(sequence[::3], packed[::3])
+        self.assertEqual("N", packed[4])
+        self.assertEqual("A", packed[-1])
+        self.assertRaises(IndexError, packed.__getitem__, 50)
+        codons = list(packed.codons())
+        self.assertEqual([sequence[i : i + 3] for i in range(0, 50, 3)], codons)
+        self.assertEqual("", str(l2.PackedSequence()))
+
+        # soft-masked bases pack at 2 bits too, not one side entry per base
+        masked = "acgt" * 25000 + "ACGTNNNN" + "ttgca" * 20 + "n"
+        tracemalloc.start()
+        try:
+            packed = l2.PackedSequence(masked)
+            held = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(masked, str(packed))
+        self.assertEqual(masked[99990:100030], packed[99990:100030])
+        self.assertLess(held, len(masked) // 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "genes.fasta")
+            with open(path, "w") as file:
+                file.write(">a\nCTGCTANNN\n>b\nAAAGGC\n")
+            genes = l2.load_packed_fasta(path)
+            self.assertEqual({"a": 9, "b": 6}, {g: len(s) for g, s in genes.items()})
+            cwd = os.getcwd()
+            table = os.path.abspath("Ecol_codon_freqs.csv")
+            os.chdir(tmp)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    packed_result = l2.optimize_gene("a", genes, table)
+                    self.assertEqual(packed_result, l2.optimize_gene("a", path, table))
+                    self.assertEqual(-1, l2.deoptimize_gene("zz", genes, table))
+            finally:
+                os.chdir(cwd)
+            plan = l2.load_codon_plan("Ecol_codon_freqs.csv")
+            self.assertEqual(plan.apply("AAAGGC", l2.OPTIMIZE), plan.apply(genes["b"], l2.OPTIMIZE))
+
+    def test_bench_compare(self):
+        import lab2_bench
+
+        baseline = {"stages": {
+            "parse": {"seconds": 1.0, "peak_bytes": 1000, "mb_per_s": 10.0},
+            "rewrite": {"seconds": 1.0, "peak_bytes": 1000, "codons_per_s": 100.0},
+        }}
+        within = {"stages": {
+            "parse": {"seconds": 1.05, "peak_bytes": 1050, "mb_per_s": 9.5},
+            "rewrite": {"seconds": 1.0, "peak_bytes": 900, "codons_per_s": 120.0},
+            "new": {"seconds": 1.0, "peak_bytes": 10 ** 9},
+        }}
+        self.assertEqual([], lab2_bench.compare(within, baseline, 0.1))
+
+        worse = {"stages": {
+            "parse": {"seconds": 2.0, "peak_bytes": 1000, "mb_per_s": 5.0},
+            "rewrite": {"seconds": 1.0, "peak_bytes": 2000, "codons_per_s": 100.0},
+        }}
+        regressions = lab2_bench.compare(worse, baseline, 0.1)
+        self.assertEqual(2, len(regressions))
+        self.assertTrue(regressions[0].startswith("parse mb_per_s"))
+        self.assertTrue(regressions[1].startswith("rewrite peak_bytes"))
+
+        # the traced callable, not the timed one, decides the reported peak
+        result = lab2_bench.measure(lambda: None, repeat=1, traced=lambda: bytearray(10 ** 6))
+        self.assertGreaterEqual(result["peak_bytes"], 10 ** 6)
+
     def test_docstrings(self):
         #test for existance of docstrings
         self.assertFalse(l2.optimize_gene.__doc__ == None)
@@ -1,36 +1,207 @@
-import matplotlib.pyplot as plt
+import math
+import os
+import sys
+from collections import Counter
 
-data = [0.65, 0.76, 0.71, 0.75, 0.81, 0.8, 0.7, 0.73, 0.85, 0.81, 0.78, 0.75, 0.81, 0.8, 0.7, 0.83,
-        0.75, 0.91, 0.96, 0.81, 0.93, 0.88, 0.85, 0.81, 0.81, 0.73, 0.95, 0.81, 0.83, 0.81, 0.85]
+import numpy as np
 
-# Calculate avg mean time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from render import finish, pyplot
 
-avg_time = sum(data) / len(data)
+# Values parsed per chunk when streaming samples from a file
+SAMPLE_CHUNK_SIZE = 1 << 16
+# Histogram bins kept before neighbouring bins are merged pairwise
+HISTOGRAM_MAX_BINS = 4096
 
-print(f"Average Mean Time: {avg_time:.3f} seconds")
 
-# Calculate standard deviation
+class StreamingStats:
+    """
+    One-pass summary statistics for a stream of samples.
 
-squared_diffs = [(x - avg_time) ** 2 for x in data]
-std_dev = (sum(squared_diffs) / len(data)) ** 0.5
+    Keeps the count, mean and sum of squared deviations (Welford), the min and
+    max, and a sparse histogram of fixed-width bins, but never the samples
+    themselves. The histogram starts at bin_width and holds at most
+    HISTOGRAM_MAX_BINS bins: past that, neighbouring bins are merged and the
+    width doubles, so memory stays bounded however wide or noisy the data is.
+    Chunks are summarized with NumPy and folded in with the pairwise
+    (Chan et al.) update, which is also how results from separate workers merge.
+    """
 
-print(f"Standard Deviation: {std_dev:.3f} seconds")
+    def __init__(self, bin_width=0.001):
+        self.bin_width = bin_width
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.bins = Counter()  # bin index -> count; bin i covers [i, i + 1) * bin_width
 
-# Percentage of data within one standard deviation
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size == 0:
+            return self
+        chunk = StreamingStats(self.bin_width)
+        chunk.count = values.size
+        chunk.mean = values.mean()
+        chunk.m2 = ((values - chunk.mean) ** 2).sum()
+        chunk.min = values.min()
+        chunk.max = values.max()
+        index, counts = np.unique(np.floor(values / self.bin_width).astype(np.int64), return_counts=True)
+        while len(index) > HISTOGRAM_MAX_BINS:
+            # Bin i at width w lies inside bin i >> 1 at width 2w
+            index, inverse = np.unique(index >> 1, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+            chunk.bin_width *= 2
+        chunk.bins = Counter(dict(zip(index.tolist(), counts.tolist())))
+        return self.merge(chunk)
 
-within_one_std = [x for x in data if (avg_time - std_dev) <= x <= (avg_time + std_dev)]
-percentage_within_one_std = (len(within_one_std) / len(data)) * 100
+    def _coarsen(self, bin_width):
+        # Merge neighbouring bins until they are bin_width wide
+        while self.bin_width < bin_width:
+            bins = Counter()
+            for index, count in self.bins.items():
+                bins[index >> 1] += count
+            self.bins = bins
+            self.bin_width *= 2
 
-print(f"Percentage of data within one standard deviation: {percentage_within_one_std:.3f}%")
+    def merge(self, other):
+        ratio = max(other.bin_width, self.bin_width) / min(other.bin_width, self.bin_width)
+        if ratio != 2 ** round(math.log2(ratio)):
+            raise ValueError("can only merge statistics whose bin widths differ by a power of two")
+        if other.count == 0:
+            return self
+        if other.bin_width < self.bin_width:
+            other = StreamingStats(other.bin_width).merge(other)  # coarsen a copy
+            other._coarsen(self.bin_width)
+        self._coarsen(other.bin_width)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.bins.update(other.bins)
+        while len(self.bins) > HISTOGRAM_MAX_BINS:
+            self._coarsen(2 * self.bin_width)
+        return self
 
-# Graph data
+    @property
+    def variance(self):
+        # Population variance, dividing by n
+        return self.m2 / self.count if self.count else math.nan
 
-plt.hist(data, bins=10, color='skyblue', edgecolor='black', alpha=0.7)
-plt.axvline(x=avg_time, color='r', linestyle='--', label='Average Mean Time')
-plt.axvspan(avg_time - std_dev, avg_time + std_dev, color='gray', alpha=0.2, label='1 Std Dev')
-plt.title('Histogram of Mean Time Data')
-plt.xlabel('Mean Time (seconds)')
-plt.ylabel('Frequency')
-plt.legend()
-plt.grid()
-plt.show()
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def fraction_within(self, k=1, source=None):
+        """
+        Fraction of samples within k standard deviations of the mean.
+
+        With source (anything read_samples accepts, read a second time) the
+        samples are counted exactly. Without it the answer is estimated from the
+        histogram, treating samples as spread evenly across each bin.
+        """
+        low = self.mean - k * self.std
+        high = self.mean + k * self.std
+        if source is not None:
+            within = sum(int(((chunk >= low) & (chunk <= high)).sum()) for chunk in read_samples(source))
+            return within / self.count
+
+        within = 0.0
+        for index, count in self.bins.items():
+            start = index * self.bin_width
+            overlap = min(high, start + self.bin_width) - max(low, start)
+            within += count * min(max(overlap / self.bin_width, 0.0), 1.0)
+        return within / self.count
+
+    def histogram(self, bins=10):
+        """Regroup the fine bins into equal-width bins over [min, max], like np.histogram."""
+        edges = np.linspace(self.min, self.max, bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        if self.bins:
+            index, fine = np.array(sorted(self.bins.items())).T
+            centers = np.clip((index + 0.5) * self.bin_width, self.min, self.max)
+            slot = np.clip(np.searchsorted(edges, centers, side="right") - 1, 0, bins - 1)
+            np.add.at(counts, slot, fine)
+        return counts, edges
+
+
+def read_samples(source, chunk_size=SAMPLE_CHUNK_SIZE):
+    """
+    Yield NumPy arrays of samples from a file path, an open text file, "-" for
+    stdin, or an in-memory sequence. Values may be separated by whitespace or commas.
+    """
+    if isinstance(source, str):
+        if source == "-":
+            yield from read_samples(sys.stdin, chunk_size)
+            return
+        with open(source) as file:
+            yield from read_samples(file, chunk_size)
+        return
+    if not hasattr(source, "read"):
+        values = np.asarray(source, dtype=float).ravel()
+        for start in range(0, len(values), chunk_size):
+            yield values[start : start + chunk_size]
+        return
+
+    tokens = []
+    for line in source:
+        tokens.extend(line.replace(",", " ").split())
+        if len(tokens) >= chunk_size:
+            yield np.array(tokens, dtype=float)
+            tokens = []
+    if tokens:
+        yield np.array(tokens, dtype=float)
+
+
+def summarize(source, bin_width=0.001):
+    stats = StreamingStats(bin_width)
+    for chunk in read_samples(source):
+        stats.update(chunk)
+    return stats
+
+
+if __name__ == "__main__":
+    # Timing samples come from a file (or - for stdin) when given, else the lab's data
+    if len(sys.argv) > 1:
+        data = sys.argv[1]
+    else:
+        data = [0.65, 0.76, 0.71, 0.75, 0.81, 0.8, 0.7, 0.73, 0.85, 0.81, 0.78, 0.75, 0.81, 0.8, 0.7, 0.83,
+                0.75, 0.91, 0.96, 0.81, 0.93, 0.88, 0.85, 0.81, 0.81, 0.73, 0.95, 0.81, 0.83, 0.81, 0.85]
+
+    stats = summarize(data)
+
+    # Calculate avg mean time
+
+    avg_time = stats.mean
+
+    print(f"Average Mean Time: {avg_time:.3f} seconds")
+
+    # Calculate standard deviation
+
+    std_dev = stats.std
+
+    print(f"Standard Deviation: {std_dev:.3f} seconds")
+
+    # Percentage of data within one standard deviation (stdin can't be read twice)
+
+    exact_source = None if data == "-" else data
+    percentage_within_one_std = stats.fraction_within(1, exact_source) * 100
+
+    print(f"Percentage of data within one standard deviation: {percentage_within_one_std:.3f}%")
+
+    # Graph data
+
+    counts, edges = stats.histogram(bins=10)
+    plt = pyplot()
+    plt.hist(edges[:-1], edges, weights=counts, color='skyblue', edgecolor='black', alpha=0.7)
+    plt.axvline(x=avg_time, color='r', linestyle='--', label='Average Mean Time')
+    plt.axvspan(avg_time - std_dev, avg_time + std_dev, color='gray', alpha=0.2, label='1 Std Dev')
+    plt.title('Histogram of Mean Time Data')
+    plt.xlabel('Mean Time (seconds)')
+    plt.ylabel('Frequency')
+    plt.legend()
+    plt.grid()
+    finish('lab1_histogram')
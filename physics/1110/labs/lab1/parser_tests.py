@@ -0,0 +1,98 @@
+import io
+import os
+import tempfile
+import unittest
+from collections import Counter
+import numpy as np
+import parser
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.values = rng.normal(9.8, 0.05, 20000)
+
+    def assertStatsMatch(self, stats, values):
+        self.assertEqual(stats.count, len(values))
+        np.testing.assert_allclose([stats.mean, stats.std], [values.mean(), values.std()], rtol=1e-12)
+        self.assertEqual((stats.min, stats.max), (values.min(), values.max()))
+        self.assertEqual(sum(stats.bins.values()), len(values))
+
+    def assertBinsMatch(self, stats, values):
+        # Power-of-two widths divide exactly, so every sample's bin is known
+        self.assertEqual(stats.bins, Counter(np.floor(values / stats.bin_width).astype(np.int64).tolist()))
+
+    def test_update(self):
+        stats = parser.StreamingStats()
+        for start in range(0, len(self.values), 3000):
+            stats.update(self.values[start:start + 3000])
+        stats.update([])
+        self.assertStatsMatch(stats, self.values)
+
+    def test_merge(self):
+        parts = [parser.summarize(self.values[start:start + 7000]) for start in range(0, len(self.values), 7000)]
+        stats = parser.StreamingStats()
+        for part in parts:
+            stats.merge(part)
+        self.assertStatsMatch(stats, self.values)
+        # merging an empty summary changes nothing
+        self.assertEqual(stats.mean, stats.merge(parser.StreamingStats()).mean)
+
+    def test_merge_bin_widths(self):
+        fine = parser.summarize(self.values[:10000], 2 ** -12)
+        coarse = parser.summarize(self.values[10000:], 2 ** -9)
+        fine.merge(coarse)
+        self.assertEqual(fine.bin_width, 2 ** -9)
+        self.assertStatsMatch(fine, self.values)
+        self.assertBinsMatch(fine, self.values)
+
+        # the coarser side may also be the one merged into, leaving the finer one untouched
+        fine = parser.summarize(self.values[:10000], 2 ** -12)
+        coarse = parser.summarize(self.values[10000:], 2 ** -9).merge(fine)
+        self.assertEqual((coarse.bin_width, fine.bin_width), (2 ** -9, 2 ** -12))
+        self.assertBinsMatch(coarse, self.values)
+        self.assertBinsMatch(fine, self.values[:10000])
+        self.assertRaises(ValueError, fine.merge, parser.summarize(self.values, 3 * 2 ** -12))
+
+    def test_histogram_cap(self):
+        wide = np.random.default_rng(1).uniform(-500, 500, 50000)
+        # one chunk with too many bins, and many chunks that only overflow once merged
+        for stats in (parser.summarize(wide, 2 ** -4),
+                      parser.StreamingStats(2 ** -4).update(wide[:25000]).update(wide[25000:])):
+            self.assertLessEqual(len(stats.bins), parser.HISTOGRAM_MAX_BINS)
+            self.assertGreater(stats.bin_width, 2 ** -4)
+            self.assertStatsMatch(stats, wide)
+            self.assertBinsMatch(stats, wide)
+        chunked = parser.StreamingStats(2 ** -4)
+        for start in range(0, len(wide), 500):
+            chunked.update(wide[start:start + 500])
+        self.assertLessEqual(len(chunked.bins), parser.HISTOGRAM_MAX_BINS)
+        self.assertBinsMatch(chunked, wide)
+
+    def test_fraction_within(self):
+        stats = parser.summarize(self.values)
+        for k in (1, 2, 3):
+            low, high = self.values.mean() - k * self.values.std(), self.values.mean() + k * self.values.std()
+            exact = np.mean((self.values >= low) & (self.values <= high))
+            self.assertAlmostEqual(stats.fraction_within(k, self.values), exact, places=12)
+            # the histogram estimate is close with bins much narrower than the spread
+            self.assertAlmostEqual(stats.fraction_within(k), exact, delta=0.002)
+
+    def test_read_samples(self):
+        text = "1.5,2, 3\n4 5\n\n6\t7,8\n-9e-1\n"
+        expected = [1.5, 2, 3, 4, 5, 6, 7, 8, -0.9]
+        chunks = list(parser.read_samples(io.StringIO(text), chunk_size=3))
+        self.assertTrue(all(len(chunk) >= 3 for chunk in chunks[:-1]))
+        self.assertEqual(np.concatenate(chunks).tolist(), expected)
+        self.assertEqual(np.concatenate(list(parser.read_samples(expected, chunk_size=4))).tolist(), expected)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "samples.txt")
+            with open(path, "w") as file:
+                file.write(text)
+            stats = parser.summarize(path)
+        self.assertStatsMatch(stats, np.array(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
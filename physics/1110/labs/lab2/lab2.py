@@ -16,47 +16,140 @@ approximately 45.99 m/s as time approaches 20 seconds. As it approaches that fin
 the acceleration decreases, eventually leveling off. This results in a graph with a concave down shape.
 """
 
-import csv
-import matplotlib.pyplot as plt
-
-values = []
-with open('physics/1110/labs/lab2/values.csv', newline='') as csvfile:
-    reader = csv.reader(csvfile)
-    for row in reader:
-        values.append(row)
-
-# Skip header
-parsedValues = values[1:]
-
-# Use a linear regression to fit to the first portion of the data
-def linear_regression(data):
-    n = len(data)
-    sum_x = sum(int(row[0]) for row in data)
-    sum_y = sum(float(row[1]) for row in data)
-    sum_xy = sum(int(row[0]) * float(row[1]) for row in data)
-    sum_x2 = sum(int(row[0])**2 for row in data)
-
-    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x**2)
-    intercept = (sum_y - slope * sum_x) / n
-    return slope, intercept
-
-slope, intercept = linear_regression(parsedValues[:8]) # Fit to the first 8 data points
-print(f"Slope: {slope}, Intercept: {intercept}")
-
-# Graph data using data points
-
-x = [int(row[0]) for row in parsedValues]
-speed = [float(row[1]) for row in parsedValues]
-
-plt.scatter(x, speed, label='Speed', marker='o')
-
-# Plot the linear regression line
-regression_line = [slope * xi + intercept for xi in x]
-plt.plot(x, regression_line, color='red', label='Linear Regression Fit')
-
-plt.xlabel('Time (s)')
-plt.ylabel('Speed (m/s)')
-plt.title('Car Speed Over Time')
-plt.xticks(range(min(x), max(x)+1, 1))
-plt.legend()
-plt.show()
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from labdata import load_csv
+from render import decimate, finish, pyplot
+
+
+class LinearAccumulator:
+    """
+    Running least-squares line fit, updated one point at a time.
+
+    Keeps the count, means and centered sums (Welford-style co-moments) instead of
+    raw sums of x, y, xy and x^2, so large or offset values don't lose precision.
+    Points can be added and removed in O(1) for sliding windows, and accumulators
+    built over separate chunks of data can be merged.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0  # sum of (x - mean_x)^2
+        self.syy = 0.0  # sum of (y - mean_y)^2
+        self.sxy = 0.0  # sum of (x - mean_x) * (y - mean_y)
+
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.sxx += dx * (x - self.mean_x)
+        self.syy += dy * (y - self.mean_y)
+        self.sxy += dx * (y - self.mean_y)
+
+    def remove(self, x, y):
+        # Exact inverse of add for a point that was previously added
+        if self.n <= 1:
+            self.__init__()
+            return
+        self.n -= 1
+        mean_x = self.mean_x - (x - self.mean_x) / self.n
+        mean_y = self.mean_y - (y - self.mean_y) / self.n
+        self.sxx -= (x - mean_x) * (x - self.mean_x)
+        self.syy -= (y - mean_y) * (y - self.mean_y)
+        self.sxy -= (x - mean_x) * (y - self.mean_y)
+        self.mean_x, self.mean_y = mean_x, mean_y
+
+    def merge(self, other):
+        # Combine with an accumulator over different points (Chan et al. pairwise update)
+        n = self.n + other.n
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.sxx += other.sxx + dx * dx * weight
+        self.syy += other.syy + dy * dy * weight
+        self.sxy += other.sxy + dx * dy * weight
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.n = n
+        return self
+
+    @property
+    def slope(self):
+        return self.sxy / self.sxx
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def rms_residual(self):
+        # Root-mean-square vertical distance of the points from the fitted line
+        if self.n < 2 or self.sxx == 0:
+            return 0.0
+        residual = max(self.syy - self.sxy**2 / self.sxx, 0.0)
+        return (residual / self.n) ** 0.5
+
+
+def linear_window(points, tolerance, min_points=3):
+    """
+    Find the longest initial run of points that stays close to a straight line.
+
+    Points are added one at a time and the scan stops at the first one that
+    pushes the RMS residual of the fit above tolerance, so the data is only read
+    once. Returns the number of points in the window and its LinearAccumulator.
+    """
+    fit = LinearAccumulator()
+    for x, y in points:
+        fit.add(x, y)
+        if fit.n > min_points and fit.rms_residual > tolerance:
+            fit.remove(x, y)
+            break
+    return fit.n, fit
+
+
+# Largest RMS residual (m/s) for the data to still count as linear
+LINEAR_TOLERANCE = 0.5
+
+if __name__ == "__main__":
+    # Typed columns, parsed once and cached in values.csv.cache
+    values = load_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'values.csv'), {'time': 'i8', 'car_a_speed': 'f8'})
+
+    times = values['time'].tolist()
+    speeds = values['car_a_speed'].tolist()
+
+    # Use a linear regression to fit to the first portion of the data
+    window, fit = linear_window(zip(times, speeds), LINEAR_TOLERANCE)
+    slope, intercept = fit.slope, fit.intercept
+    print(f"Linear for the first {window} data points")
+    print(f"Slope: {slope}, Intercept: {intercept}")
+
+    # Graph data using data points
+
+    x = times
+    speed = speeds
+
+    plt = pyplot()
+    plt.scatter(*decimate(x, speed), label='Speed', marker='o')
+
+    # Plot the linear regression line; a straight line only needs its end points
+    ends = [min(x), max(x)]
+    regression_line = [slope * xi + intercept for xi in ends]
+    plt.plot(ends, regression_line, color='red', label='Linear Regression Fit')
+
+    plt.xlabel('Time (s)')
+    plt.ylabel('Speed (m/s)')
+    plt.title('Car Speed Over Time')
+    plt.xticks(range(min(x), max(x)+1, 1))
+    plt.legend()
+    finish('lab2_speed')
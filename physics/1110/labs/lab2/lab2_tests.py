@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import unittest
+import numpy as np
+import lab2
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.arange(50, dtype=float) + 1e6  # offset, to exercise the centered sums
+        self.y = 3.5 * self.x - 2e6 + rng.normal(0, 0.5, self.x.size)
+
+    def assertFitMatches(self, fit, x, y):
+        slope, intercept = np.polyfit(x, y, 1)
+        residual = np.sqrt(np.mean((y - np.polyval([slope, intercept], x)) ** 2))
+        np.testing.assert_allclose([fit.slope, fit.intercept, fit.rms_residual],
+                                   [slope, intercept, residual], rtol=1e-6, atol=1e-6)
+
+    def test_add(self):
+        fit = lab2.LinearAccumulator()
+        for x, y in zip(self.x, self.y):
+            fit.add(x, y)
+        self.assertEqual(fit.n, 50)
+        self.assertFitMatches(fit, self.x, self.y)
+
+    def test_remove(self):
+        fit = lab2.LinearAccumulator()
+        for x, y in zip(self.x, self.y):
+            fit.add(x, y)
+        # slide the window off the first 20 points
+        for x, y in zip(self.x[:20], self.y[:20]):
+            fit.remove(x, y)
+        self.assertEqual(fit.n, 30)
+        self.assertFitMatches(fit, self.x[20:], self.y[20:])
+
+        fit.remove(self.x[20], self.y[20])
+        empty = lab2.LinearAccumulator()
+        empty.add(1.0, 2.0)
+        empty.remove(1.0, 2.0)
+        self.assertEqual((empty.n, empty.sxx, empty.mean_y), (0, 0.0, 0.0))
+
+    def test_merge(self):
+        parts = []
+        for start in range(0, 50, 15):
+            part = lab2.LinearAccumulator()
+            for x, y in zip(self.x[start:start + 15], self.y[start:start + 15]):
+                part.add(x, y)
+            parts.append(part)
+        fit = lab2.LinearAccumulator()
+        for part in parts:
+            fit.merge(part)
+        self.assertEqual(fit.n, 50)
+        self.assertFitMatches(fit, self.x, self.y)
+        # merging an empty accumulator changes nothing
+        self.assertEqual(fit.slope, fit.merge(lab2.LinearAccumulator()).slope)
+
+    def test_linear_window(self):
+        x = np.arange(1, 21, dtype=float)
+        y = np.where(x <= 10, 4 * x, 40 + 0.5 * (x - 10) ** 2)
+        window, fit = lab2.linear_window(zip(x, y), lab2.LINEAR_TOLERANCE)
+        self.assertEqual(window, 10)
+        self.assertFitMatches(fit, x[:window], y[:window])
+
+    def test_import_skips_matplotlib(self):
+        # Plotting only happens when run as a script, so importing for the fit is cheap
+        code = "import sys, lab2; print('matplotlib' in sys.modules)"
+        here = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == '__main__':
+    unittest.main()
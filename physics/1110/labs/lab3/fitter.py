@@ -1,46 +1,225 @@
-# Data is in 1/60 second intervals, as we're measuring at 60 Hz
-# Each entry is the position in cm, starting at 0 seconds
-data = tuple(((i + 1)/60, pos) for i, pos in enumerate([0, 1, 1.8, 3.2, 4.8, 6.5, 8.8, 11.1, 13.7, 16.7, 19.8, 23.3, 27, 31.1, 35.3, 39.9, 44.7, 49.9, 55.2, 60.8, 66.7, 72.9, 79.4, 86.1]))
+import math
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-otherData = [11.403, 0.1153, 0.0144]
-otherDataTwo = [9.6624, 0.368, -0.0006]
-otherDataThree = [9.9388, 0.2109, 0.054]
-otherDataFour = [8.9152, 0.4102, -0.0034]
+import numpy as np
 
-# There were further points that we chose to leave out, as there was a jump in the data, and we could not be confident of the timing of the fall past 86.1 cm
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from labdata import load_csv
+from render import decimate, finish, pyplot
 
-# Convert data to meters
-data = tuple((t, p / 100) for t, p in data)
+# Bootstrap resamples per work unit; fixed so results don't depend on the worker count
+BOOTSTRAP_CHUNK = 256
+# Samples per chunk when differentiating long captures
+DERIVATIVE_CHUNK = 1 << 20
 
-print(data)
 
-# Fit a quadratic to the data
-import numpy as np
-coeffs = np.polyfit(*zip(*data), 2)
-# Double a coeff
-coeffs = (2 * coeffs[0], coeffs[1], coeffs[2])
-print("Fitted coefficients (a, b, c) for ax^2 + bx + c:", coeffs)
+def fit_trials(positions, times, degree=2):
+    """
+    Least-squares polynomial fits for many trials at once.
 
-# Calculate avg and stdev for our coeffs and other data
-import statistics
-all_coeffs = [coeffs, otherData, otherDataTwo, otherDataThree, otherDataFour]
-a_values = [c[0] for c in all_coeffs]
-b_values = [c[1] for c in all_coeffs]
-c_values = [c[2] for c in all_coeffs]
-
-avg_coeffs = [statistics.mean(a_values), statistics.mean(b_values), statistics.mean(c_values)]
-stdev_coeffs = [statistics.stdev(a_values), statistics.stdev(b_values), statistics.stdev(c_values)]
-print("Average coefficients (a, b, c):", avg_coeffs)
-print("Standard deviation of coefficients (a, b, c):", stdev_coeffs)
-
-avg_coeffs_for_graphing = (avg_coeffs[0] / 2, avg_coeffs[1], avg_coeffs[2])
-
-# Graph the data
-import matplotlib.pyplot as plt
-plt.scatter(*zip(*data))
-plt.plot(np.linspace(0, max(t for t, p in data), 100), np.polyval(avg_coeffs_for_graphing, np.linspace(0, max(t for t, p in data), 100)), color='red')
-
-plt.xlabel("Time (s)")
-plt.ylabel("Position (m)")
-plt.title("Position vs Time")
-plt.show()
\ No newline at end of file
+    positions is either a list of 1-D arrays (one per trial, any lengths) or a
+    2-D array with one trial per row, padded with NaN. times is a single 1-D
+    array shared by every trial, or one time array per trial in the same
+    layout as positions. Trials sampled at the same times share one Vandermonde
+    QR factorization and are solved together as columns of one right-hand side.
+
+    Returns a (trials, degree + 1) array of coefficients, highest power first
+    like np.polyfit.
+    """
+    positions = [np.asarray(p, dtype=float) for p in positions]
+    if np.ndim(times[0]) == 0:  # one time base for every trial
+        times = [np.asarray(times, dtype=float)] * len(positions)
+    else:
+        times = [np.asarray(t, dtype=float) for t in times]
+
+    # Group trials by their time base, dropping NaN padding
+    groups = {}
+    for trial, (t, p) in enumerate(zip(times, positions)):
+        keep = ~(np.isnan(p) | np.isnan(t[: len(p)]))
+        t = t[: len(p)][keep]
+        group = groups.setdefault(t.tobytes(), (t, [], []))
+        group[1].append(trial)
+        group[2].append(p[keep])
+
+    coeffs = np.empty((len(positions), degree + 1))
+    for t, trials, columns in groups.values():
+        q, r = np.linalg.qr(np.vander(t, degree + 1))
+        coeffs[trials] = np.linalg.solve(r, q.T @ np.column_stack(columns)).T
+    return coeffs
+
+
+def _bootstrap_chunk(t, p, degree, count, seed):
+    rng = np.random.default_rng(seed)
+    n = len(t)
+    index = rng.integers(0, n, size=(count, n))
+    # A resample needs degree + 1 distinct times to pin down the polynomial
+    while True:
+        ordered = np.sort(t[index], axis=1)
+        distinct = 1 + (np.diff(ordered, axis=1) != 0).sum(axis=1)
+        bad = distinct <= degree
+        if not bad.any():
+            break
+        index[bad] = rng.integers(0, n, size=(bad.sum(), n))
+
+    # One batched QR over every resample's Vandermonde matrix
+    q, r = np.linalg.qr(np.vander(t, degree + 1)[index])
+    rhs = np.einsum("bij,bi->bj", q, p[index])
+    return np.linalg.solve(r, rhs[..., None])[..., 0]
+
+
+def bootstrap_fit(times, positions, degree=2, resamples=2000, confidence=0.95, seed=0, workers=None):
+    """
+    Bootstrap confidence intervals for each polynomial coefficient.
+
+    Points are resampled with replacement and refitted, in chunks of
+    BOOTSTRAP_CHUNK resamples spread over worker processes (workers=1 runs in
+    this process). Each chunk gets its own stream spawned from seed, so the
+    result is the same for any number of workers.
+
+    Returns (lower, upper) arrays of the percentile interval, highest power first.
+    """
+    t = np.asarray(times, dtype=float)
+    p = np.asarray(positions, dtype=float)
+    counts = [min(BOOTSTRAP_CHUNK, resamples - i) for i in range(0, resamples, BOOTSTRAP_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    args = ([t] * len(counts), [p] * len(counts), [degree] * len(counts), counts, seeds)
+
+    if workers == 1:
+        chunks = list(map(_bootstrap_chunk, *args))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, *args))
+
+    samples = np.concatenate(chunks)
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(samples, [tail, 100 - tail], axis=0)
+    return lower, upper
+
+
+def savgol_matrix(window, order, deriv, dt, offsets):
+    """
+    Savitzky-Golay weights: row i, dotted with `window` consecutive samples,
+    gives the deriv-th derivative of their least-squares polynomial of the given
+    order at offsets[i] samples from the window's center. Offset 0 is the usual
+    convolution kernel; the others evaluate the edge windows.
+    """
+    if window % 2 == 0 or window <= order:
+        raise ValueError("window must be odd and longer than the polynomial order")
+    half = window // 2
+    fit = np.linalg.pinv(np.vander(np.arange(-half, half + 1), order + 1, increasing=True))
+    # d^deriv/dz^deriv of z^k at each offset
+    powers = np.arange(order + 1)
+    scale = np.array([math.perm(k, deriv) for k in powers], dtype=float)
+    basis = scale * np.asarray(offsets, dtype=float)[:, None] ** np.maximum(powers - deriv, 0)
+    return basis @ fit / dt**deriv
+
+
+def iter_savgol(chunks, dt, window=7, order=2, derivs=(1, 2)):
+    """
+    Savitzky-Golay derivatives of a sample stream, one output chunk per input chunk.
+
+    Each yielded array has one row per entry of derivs (e.g. velocity and
+    acceleration from positions). The interior is a single correlation with the
+    precomputed kernel per chunk; only window - 1 samples are carried between
+    chunks, so streams need not fit in memory. The first and last window // 2
+    samples are evaluated from the polynomial fitted to the first or last full
+    window rather than from padded data.
+    """
+    half = window // 2
+    kernels = [savgol_matrix(window, order, d, dt, [0])[0] for d in derivs]
+    leading = [savgol_matrix(window, order, d, dt, range(-half, 0)) for d in derivs]
+    trailing = [savgol_matrix(window, order, d, dt, range(1, half + 1)) for d in derivs]
+
+    carry = np.empty(0)
+    started = False
+    for chunk in chunks:
+        samples = np.concatenate([carry, np.asarray(chunk, dtype=float)])
+        if len(samples) < window:
+            carry = samples
+            continue
+        interior = np.array([np.correlate(samples, kernel, "valid") for kernel in kernels])
+        if not started:
+            edge = np.array([matrix @ samples[:window] for matrix in leading])
+            interior = np.hstack([edge, interior])
+            started = True
+        yield interior
+        carry = samples[-window:]
+        # Keep window - 1 samples for the next correlation; the extra one serves the end edge
+        carry, last = carry[1:], carry
+
+    if not started:
+        raise ValueError(f"need at least {window} samples")
+    yield np.array([matrix @ last for matrix in trailing])
+
+
+def savgol_derivatives(positions, dt, window=7, order=2, derivs=(1, 2), chunk_size=DERIVATIVE_CHUNK):
+    """
+    Savitzky-Golay derivatives of a whole array (including a memory-mapped one).
+
+    Returns one array per entry of derivs, each the same length as positions.
+    """
+    chunks = (positions[i : i + chunk_size] for i in range(0, len(positions), chunk_size))
+    return tuple(np.hstack(list(iter_savgol(chunks, dt, window, order, derivs))))
+
+
+if __name__ == "__main__":
+    # Data is in 1/60 second intervals, as we're measuring at 60 Hz
+    # Each row of drop.csv is a frame number and the position in cm
+    drop = load_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "drop.csv"), {"frame": "i8", "position_cm": "f8"})
+    data = tuple(zip((drop["frame"] / 60).tolist(), drop["position_cm"].tolist()))
+
+    otherData = [11.403, 0.1153, 0.0144]
+    otherDataTwo = [9.6624, 0.368, -0.0006]
+    otherDataThree = [9.9388, 0.2109, 0.054]
+    otherDataFour = [8.9152, 0.4102, -0.0034]
+
+    # There were further points that we chose to leave out, as there was a jump in the data, and we could not be confident of the timing of the fall past 86.1 cm
+
+    # Convert data to meters
+    data = tuple((t, p / 100) for t, p in data)
+
+    print(data)
+
+    # Fit a quadratic to the data
+    times, positions = (np.array(column) for column in zip(*data))
+    coeffs = fit_trials([positions], times)[0]
+    # Double a coeff
+    coeffs = (2 * coeffs[0], coeffs[1], coeffs[2])
+    print("Fitted coefficients (a, b, c) for ax^2 + bx + c:", coeffs)
+
+    # Time-resolved velocity and acceleration from 7-sample (~0.1 s) windows
+    velocity, acceleration = savgol_derivatives(positions, 1 / 60)
+    print("Final velocity (m/s):", float(velocity[-1]))
+    print("Savitzky-Golay acceleration mean and stdev (m/s^2):", (float(acceleration.mean()), float(acceleration.std())))
+
+    # Bootstrap a 95% interval for our own coefficients
+    lower, upper = bootstrap_fit(times, positions, workers=os.cpu_count())
+    print("95% bootstrap interval for a:", (2 * lower[0], 2 * upper[0]))
+    print("95% bootstrap interval for b:", (lower[1], upper[1]))
+    print("95% bootstrap interval for c:", (lower[2], upper[2]))
+
+    # Calculate avg and stdev for our coeffs and other data
+    all_coeffs = [coeffs, otherData, otherDataTwo, otherDataThree, otherDataFour]
+    a_values = [c[0] for c in all_coeffs]
+    b_values = [c[1] for c in all_coeffs]
+    c_values = [c[2] for c in all_coeffs]
+
+    avg_coeffs = [statistics.mean(a_values), statistics.mean(b_values), statistics.mean(c_values)]
+    stdev_coeffs = [statistics.stdev(a_values), statistics.stdev(b_values), statistics.stdev(c_values)]
+    print("Average coefficients (a, b, c):", avg_coeffs)
+    print("Standard deviation of coefficients (a, b, c):", stdev_coeffs)
+
+    avg_coeffs_for_graphing = (avg_coeffs[0] / 2, avg_coeffs[1], avg_coeffs[2])
+
+    # Graph the data
+    plt = pyplot()
+    plt.scatter(*decimate(times, positions))
+    plt.plot(np.linspace(0, max(t for t, p in data), 100), np.polyval(avg_coeffs_for_graphing, np.linspace(0, max(t for t, p in data), 100)), color='red')
+
+    plt.xlabel("Time (s)")
+    plt.ylabel("Position (m)")
+    plt.title("Position vs Time")
+    finish("lab3_position")
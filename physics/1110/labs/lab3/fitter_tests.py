@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+import fitter
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.t = np.linspace(0, 0.5, 20)
+        self.trials = [-4.9 * self.t ** 2 + v * self.t + 1.5 + rng.normal(0, 0.01, self.t.size)
+                       for v in (0.0, 0.3, -0.2, 1.1)]
+
+    def assertFitsMatch(self, coeffs, times, positions):
+        expected = [np.polyfit(t, p, 2) for t, p in zip(times, positions)]
+        np.testing.assert_allclose(coeffs, expected, rtol=1e-9, atol=1e-9)
+
+    def test_fit_trials_ragged(self):
+        lengths = [20, 15, 18, 9]
+        positions = [p[:n] for p, n in zip(self.trials, lengths)]
+        times = [self.t[:n] for n in lengths]
+        self.assertFitsMatch(fitter.fit_trials(positions, times), times, positions)
+        # a shared time base is cut to each trial's length
+        self.assertFitsMatch(fitter.fit_trials(positions, self.t), times, positions)
+
+    def test_fit_trials_nan_padded(self):
+        padded = np.full((4, 20), np.nan)
+        lengths = [20, 12, 17, 20]
+        for row, (p, n) in enumerate(zip(self.trials, lengths)):
+            padded[row, :n] = p[:n]
+        padded[3, 5] = np.nan  # a dropped sample in the middle
+        coeffs = fitter.fit_trials(padded, self.t)
+        times = [self.t[~np.isnan(row)] for row in padded]
+        positions = [row[~np.isnan(row)] for row in padded]
+        self.assertFitsMatch(coeffs, times, positions)
+
+    def test_fit_trials_grouping(self):
+        # trials 0 and 2 share one time base, 1 and 3 another; order must survive the grouping
+        other = self.t * 1.5 + 0.01
+        times = [self.t, other, self.t, other]
+        coeffs = fitter.fit_trials(self.trials, times)
+        self.assertFitsMatch(coeffs, times, self.trials)
+
+    def test_bootstrap_workers(self):
+        p = self.trials[1]
+        serial = fitter.bootstrap_fit(self.t, p, resamples=600, workers=1)
+        parallel = fitter.bootstrap_fit(self.t, p, resamples=600, workers=2)
+        np.testing.assert_array_equal(serial[0], parallel[0])
+        np.testing.assert_array_equal(serial[1], parallel[1])
+        # the interval brackets the least-squares fit
+        fit = np.polyfit(self.t, p, 2)
+        self.assertTrue(np.all(serial[0] <= fit) and np.all(fit <= serial[1]))
+
+    def savgol_reference(self, positions, dt, window, order, deriv):
+        # Fit each sample's own window (the first or last full one at the edges) and differentiate
+        half = window // 2
+        t = np.arange(len(positions)) * dt
+        result = np.empty(len(positions))
+        for i in range(len(positions)):
+            start = min(max(i - half, 0), len(positions) - window)
+            fit = np.polyfit(t[start:start + window], positions[start:start + window], order)
+            result[i] = np.polyval(np.polyder(fit, deriv), t[i])
+        return result
+
+    def test_savgol_reference(self):
+        rng = np.random.default_rng(1)
+        dt = 0.01
+        positions = np.cumsum(rng.normal(0, 1, 60)) + 0.5 * np.arange(60) ** 1.5
+        for window, order in ((7, 2), (5, 3), (9, 2)):
+            velocity, acceleration = fitter.savgol_derivatives(positions, dt, window, order)
+            np.testing.assert_allclose(velocity, self.savgol_reference(positions, dt, window, order, 1),
+                                       rtol=1e-7, atol=1e-6)
+            np.testing.assert_allclose(acceleration, self.savgol_reference(positions, dt, window, order, 2),
+                                       rtol=1e-7, atol=1e-4)
+
+    def test_savgol_chunking(self):
+        positions = np.sin(np.linspace(0, 6, 101)) + np.linspace(0, 1, 101) ** 3
+        whole = fitter.savgol_derivatives(positions, 0.06, chunk_size=len(positions) + 50)
+        self.assertEqual([len(d) for d in whole], [101, 101])
+        for chunk_size in (1, 3, 6, 7, 8, 100):
+            chunked = fitter.savgol_derivatives(positions, 0.06, chunk_size=chunk_size)
+            np.testing.assert_allclose(chunked, whole, rtol=1e-12, atol=1e-9)
+
+    def test_savgol_too_short(self):
+        self.assertRaises(ValueError, fitter.savgol_derivatives, np.arange(6.0), 0.1)
+        self.assertRaises(ValueError, fitter.savgol_derivatives, np.arange(6.0), 0.1, chunk_size=1)
+        self.assertEqual(len(fitter.savgol_derivatives(np.arange(7.0), 0.1)[0]), 7)
+        self.assertRaises(ValueError, fitter.savgol_matrix, 6, 2, 1, 0.1, [0])
+        self.assertRaises(ValueError, fitter.savgol_matrix, 3, 3, 1, 0.1, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
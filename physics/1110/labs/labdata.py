@@ -0,0 +1,100 @@
+"""
+Typed loading of lab CSV files.
+
+load_csv parses a CSV file with a header row into a NumPy structured array, one
+typed field per schema column, in a single pass. The result is cached next to
+the source in a .cache sidecar (a stamp line followed by the array in .npy
+format); later loads skip parsing entirely, and large sidecars are
+memory-mapped instead of read.
+"""
+
+import os
+
+import numpy as np
+
+# Sidecars at least this large are memory-mapped rather than read into memory
+MMAP_THRESHOLD = 1 << 20
+SIDECAR_SUFFIX = ".cache"
+SIDECAR_MAGIC = b"labdata"
+
+
+def _stamp(stat):
+    # The CSV's size and modification time; a copy that keeps the mtime
+    # (cp -p, archive extraction) almost never keeps the size too
+    return b"%s %d %d\n" % (SIDECAR_MAGIC, stat.st_size, stat.st_mtime_ns)
+
+
+def _schema_dtype(schema):
+    # A dict or a list of (name, dtype) pairs, in the order the fields should have
+    items = schema.items() if isinstance(schema, dict) else schema
+    return np.dtype([(name, np.dtype(kind)) for name, kind in items])
+
+
+_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0,
+}
+
+
+def _read_sidecar(sidecar, stamp, dtype):
+    try:
+        with open(sidecar, "rb") as file:
+            if file.readline() != stamp:
+                return None
+            read_header = _HEADER_READERS.get(np.lib.format.read_magic(file))
+            if read_header is None:
+                return None
+            shape, fortran_order, stored = read_header(file)
+            if stored != dtype or fortran_order or len(shape) != 1:
+                return None
+            if os.path.getsize(sidecar) >= MMAP_THRESHOLD:
+                return np.memmap(file, dtype=dtype, mode="r", offset=file.tell(), shape=shape)
+            table = np.fromfile(file, dtype=dtype, count=shape[0])
+            return table if len(table) == shape[0] else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(sidecar, stamp, table):
+    try:
+        tmp = sidecar + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(stamp)
+            np.lib.format.write_array(file, table, allow_pickle=False)
+        os.replace(tmp, sidecar)
+    except OSError:
+        pass  # Caching is best-effort; a read-only directory just means no cache
+
+
+def load_csv(path, schema, cache=True):
+    """
+    Load the schema's columns of a CSV file as a typed structured array.
+
+    schema maps column names (as in the header row) to NumPy dtypes, e.g.
+    {"time": "i8", "car_a_speed": "f8"}; other columns are ignored. Index the
+    result by name to get a column, e.g. table["time"].
+
+    With cache, the parsed table is saved to path + ".cache" stamped with the
+    CSV's size and modification time, and reused until either changes or the
+    schema differs. Sidecars of MMAP_THRESHOLD bytes or more are memory-mapped
+    read-only.
+    """
+    dtype = _schema_dtype(schema)
+    stamp = _stamp(os.stat(path))
+    sidecar = path + SIDECAR_SUFFIX
+    if cache:
+        table = _read_sidecar(sidecar, stamp, dtype)
+        if table is not None:
+            return table
+
+    with open(path, newline="") as file:
+        header = [name.strip() for name in file.readline().rstrip("\r\n").split(",")]
+        missing = [name for name in dtype.names if name not in header]
+        if missing:
+            raise KeyError(f"{path} has no column(s) {', '.join(missing)}")
+        columns = [header.index(name) for name in dtype.names]
+        table = np.loadtxt(file, dtype=dtype, delimiter=",", usecols=columns, ndmin=1)
+
+    if cache:
+        _write_sidecar(sidecar, stamp, table)
+    return table
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import labdata
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "values.csv")
+        self.write("time,car_a_speed,note\n1,6.1,a\n2,10.5,b\n3,14.0,c\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write(self, text, mtime_ns=None):
+        with open(self.path, "w") as file:
+            file.write(text)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_load_and_cache(self):
+        table = labdata.load_csv(self.path, {"time": "i8", "car_a_speed": "f8"})
+        self.assertEqual(table["time"].tolist(), [1, 2, 3])
+        self.assertEqual(table["car_a_speed"].tolist(), [6.1, 10.5, 14.0])
+        self.assertTrue(os.path.exists(self.path + labdata.SIDECAR_SUFFIX))
+
+        # the second load comes from the sidecar, and matches
+        cached = labdata.load_csv(self.path, {"time": "i8", "car_a_speed": "f8"})
+        self.assertEqual(cached.tolist(), table.tolist())
+        self.assertRaises(KeyError, labdata.load_csv, self.path, {"missing": "f8"})
+
+    def test_same_mtime_different_size(self):
+        # a replacement copied with its mtime preserved (cp -p) must not be served stale
+        mtime = os.stat(self.path).st_mtime_ns
+        labdata.load_csv(self.path, {"time": "i8"})
+        self.write("time,car_a_speed,note\n1,6.1,a\n2,10.5,b\n3,14.0,c\n4,17.5,d\n", mtime)
+        self.assertEqual(labdata.load_csv(self.path, {"time": "i8"})["time"].tolist(), [1, 2, 3, 4])
+
+    def test_schema_mismatch(self):
+        labdata.load_csv(self.path, {"time": "i8"})
+        # a different schema reparses rather than reinterpreting the cached bytes
+        table = labdata.load_csv(self.path, {"time": "f8", "car_a_speed": "f8"})
+        self.assertEqual(table.dtype.names, ("time", "car_a_speed"))
+        self.assertEqual(table["time"].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(labdata.load_csv(self.path, {"time": "f8", "car_a_speed": "f8"}).tolist(), table.tolist())
+
+    def test_corrupt_sidecar(self):
+        labdata.load_csv(self.path, {"time": "i8"})
+        sidecar = self.path + labdata.SIDECAR_SUFFIX
+        with open(sidecar, "rb") as file:
+            data = file.read()
+        with open(sidecar, "wb") as file:
+            file.write(data[:-8])  # truncated
+        self.assertEqual(labdata.load_csv(self.path, {"time": "i8"})["time"].tolist(), [1, 2, 3])
+
+    def test_memory_mapped(self):
+        rows = "".join(f"{i},{i / 2},x\n" for i in range(50000))
+        self.write("time,car_a_speed,note\n" + rows)
+        original = labdata.MMAP_THRESHOLD
+        labdata.MMAP_THRESHOLD = 1024
+        try:
+            labdata.load_csv(self.path, {"time": "i8", "car_a_speed": "f8"})
+            table = labdata.load_csv(self.path, {"time": "i8", "car_a_speed": "f8"})
+        finally:
+            labdata.MMAP_THRESHOLD = original
+        self.assertIsInstance(table, np.memmap)
+        self.assertEqual(len(table), 50000)
+        self.assertEqual(table["car_a_speed"][-1], 49999 / 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Plot rendering that works on machines without a display.
+
+matplotlib is only imported when a script actually draws something. When the
+PLOT_DIR environment variable is set, or there is no display to show windows
+on, the Agg backend is used and figures are saved as PNG files in PLOT_DIR
+(default: the working directory) instead of opened with plt.show().
+
+Run as a script to render several plotting scripts in one batch:
+    python physics/1110/labs/render.py --out plots physics/1110/labs/lab1/parser.py ...
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+import numpy as np
+
+# Points per series kept by decimate; a min and a max for each of ~2000 pixel columns
+MAX_POINTS = 4000
+
+_pyplot = None
+
+
+def headless():
+    """True when figures should be written to files rather than shown."""
+    if os.environ.get("PLOT_DIR"):
+        return True
+    if sys.platform.startswith(("linux", "freebsd")):
+        return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return False
+
+
+def pyplot():
+    """Import and return matplotlib.pyplot, selecting the Agg backend when headless."""
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+
+        if headless():
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        _pyplot = plt
+    return _pyplot
+
+
+def finish(name, dpi=150):
+    """
+    Show the current figure, or when headless save it as PLOT_DIR/<name>.png.
+
+    Returns the saved path, or None if the figure was shown.
+    """
+    plt = pyplot()
+    if not headless():
+        plt.show()
+        return None
+    directory = os.environ.get("PLOT_DIR") or "."
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.png")
+    plt.savefig(path, dpi=dpi)
+    plt.close()
+    print(f"Saved {path}")
+    return path
+
+
+def decimate(x, y, max_points=MAX_POINTS):
+    """
+    Thin a series to at most about max_points points while keeping its outline.
+
+    x is split into max_points // 2 equal-width buckets, like the pixel columns
+    of the plot, and only the lowest and highest y in each bucket are kept, so
+    spikes and the envelope still show. Kept points stay in their original order,
+    so line plots of sorted x draw correctly. Short series are returned as is.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) <= max_points:
+        return x, y
+
+    buckets = max(max_points // 2, 1)
+    span = x.max() - x.min()
+    if span > 0:
+        bucket = ((x - x.min()) / span * buckets).astype(np.int64).clip(0, buckets - 1)
+    else:
+        bucket = np.zeros(len(x), dtype=np.int64)
+
+    # Sorted by bucket then y, each bucket's first entry is its min and last its max
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    keep = np.unique(np.concatenate([order[starts], order[ends]]))
+    return x[keep], y[keep]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render plotting scripts to PNG files")
+    parser.add_argument("scripts", nargs="+", help="plotting scripts to run")
+    parser.add_argument("--out", default="plots", help="directory for the figures (default: plots)")
+    args = parser.parse_args(argv)
+
+    os.environ["PLOT_DIR"] = args.out
+    failed = 0
+    for script in args.scripts:
+        saved_argv = sys.argv
+        sys.argv = [script]
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except Exception as error:
+            failed += 1
+            print(f"{script}: {error}", file=sys.stderr)
+        finally:
+            sys.argv = saved_argv
+            pyplot().close("all")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
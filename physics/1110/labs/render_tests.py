@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import render
+
+
+class MyTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.sort(rng.uniform(0, 10, 100000))
+        self.y = np.sin(self.x) + rng.normal(0, 0.1, self.x.size)
+        self.y[31337] = 5.0  # a spike that must survive
+
+    def test_decimate(self):
+        x, y = render.decimate(self.x, self.y, max_points=1000)
+        self.assertLessEqual(len(x), 1000)
+        self.assertIn(5.0, y)
+        # kept points are a subsequence of the input, in the same order
+        self.assertTrue(np.all(np.diff(x) >= 0))
+        index = np.searchsorted(self.x, x)
+        np.testing.assert_array_equal(self.x[index], x)
+        np.testing.assert_array_equal(self.y[index], y)
+
+        # every bucket keeps its lowest and highest point
+        bucket = ((self.x - self.x.min()) / np.ptp(self.x) * 500).astype(np.int64).clip(0, 499)
+        kept = bucket[index]
+        for b in (0, 1, 250, 499):
+            self.assertEqual(y[kept == b].min(), self.y[bucket == b].min())
+            self.assertEqual(y[kept == b].max(), self.y[bucket == b].max())
+
+    def test_decimate_unsorted(self):
+        order = np.random.default_rng(1).permutation(len(self.x))
+        x, y = render.decimate(self.x[order], self.y[order], max_points=1000)
+        self.assertLessEqual(len(x), 1000)
+        # positions in the shuffled input still increase
+        position = np.argsort(order)[np.searchsorted(self.x, x)]
+        self.assertTrue(np.all(np.diff(position) > 0))
+
+    def test_decimate_short_and_flat(self):
+        x, y = render.decimate(self.x[:100], self.y[:100], max_points=100)
+        np.testing.assert_array_equal(x, self.x[:100])
+        np.testing.assert_array_equal(y, self.y[:100])
+
+        # all x equal: one bucket, so just the lowest and highest point
+        x, y = render.decimate(np.ones(5000), self.y[:5000], max_points=100)
+        self.assertEqual(x.tolist(), [1.0, 1.0])
+        self.assertEqual(sorted(y.tolist()), [self.y[:5000].min(), self.y[:5000].max()])
+
+
+if __name__ == '__main__':
+    unittest.main()
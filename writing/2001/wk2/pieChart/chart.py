@@ -1,4 +1,11 @@
-import matplotlib.pyplot as plt
+import os
+import sys
+
+# Shared headless-friendly plotting helpers live with the physics labs
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 4, 'physics', '1110', 'labs'))
+from render import finish, pyplot
+
+plt = pyplot()
 
 # Example data: time spent (in hours)
 labels = ['Sleep', 'Classes', 'Exercise', 'Meals', 'Studying', 'Leisure']
@@ -14,4 +21,4 @@ wedges, texts, autotexts = plt.pie(
 )
 plt.title('How My Time is Spent Over a Day', fontsize=18)
 plt.axis('equal')  # Equal aspect ratio ensures the pie is drawn as a circle.
-plt.show()
+finish('time_pie')